@@ -0,0 +1,30 @@
+"""add reminder slot index
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Частичный индекс по времени напоминаний: планировщик выбирает
+    # только проекты, у которых напоминание назначено на текущую минуту
+    op.create_index(
+        'idx_projects_reminder_slot',
+        'projects',
+        ['reminder_hour', 'reminder_minute'],
+        postgresql_where=sa.text('is_active AND reminders_enabled'),
+    )
+
+
+def downgrade():
+    op.drop_index('idx_projects_reminder_slot', table_name='projects')
@@ -0,0 +1,34 @@
+"""add fsm states
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Хранилище состояний FSM (незавершённые диалоги переживают перезапуск бота)
+    op.create_table(
+        'fsm_states',
+        sa.Column('key', sa.String(length=255), nullable=False),
+        sa.Column('state', sa.String(length=255), nullable=True),
+        sa.Column('data', sa.Text(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('key')
+    )
+    # Индекс для очистки заброшенных диалогов по TTL
+    op.create_index('idx_fsm_states_updated_at', 'fsm_states', ['updated_at'])
+
+
+def downgrade():
+    op.drop_index('idx_fsm_states_updated_at', table_name='fsm_states')
+    op.drop_table('fsm_states')
@@ -0,0 +1,38 @@
+"""add username indexes
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Точный поиск по username без учёта регистра
+    op.create_index(
+        'idx_users_username_lower',
+        'users',
+        [sa.text('lower(username)')],
+    )
+    
+    # Нечёткий поиск (LIKE '%...%' и similarity) по триграммам
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index(
+        'idx_users_username_trgm',
+        'users',
+        [sa.text('lower(username) gin_trgm_ops')],
+        postgresql_using='gin',
+    )
+
+
+def downgrade():
+    op.drop_index('idx_users_username_trgm', table_name='users')
+    op.drop_index('idx_users_username_lower', table_name='users')
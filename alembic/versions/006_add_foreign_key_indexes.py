@@ -0,0 +1,41 @@
+"""add foreign key and composite indexes
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-16 16:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Задачи пользователя и напоминания: task_assignees по user_id
+    # (уникальный индекс (task_id, user_id) обслуживает только поиск по задаче)
+    op.create_index('idx_task_assignees_user_id', 'task_assignees', ['user_id', 'task_id'])
+    
+    # Проекты пользователя и проверка членства по пользователю
+    op.create_index('idx_project_members_user_id', 'project_members', ['user_id', 'project_id'])
+    op.create_index('idx_project_members_role_id', 'project_members', ['role_id'])
+    op.create_index('idx_project_roles_project_id', 'project_roles', ['project_id'])
+    
+    # Задачи проекта: фильтр по статусу и дедлайну, постраничный вывод по (deadline, id).
+    # Оба индекса начинаются с project_id, поэтому отдельный idx_tasks_project_id не нужен
+    op.create_index('idx_tasks_project_status_deadline', 'tasks', ['project_id', 'status', 'deadline'])
+    op.create_index('idx_tasks_project_deadline_id', 'tasks', ['project_id', 'deadline', 'id'])
+    op.drop_index('idx_tasks_project_id', table_name='tasks')
+
+
+def downgrade():
+    op.create_index('idx_tasks_project_id', 'tasks', ['project_id'])
+    op.drop_index('idx_tasks_project_deadline_id', table_name='tasks')
+    op.drop_index('idx_tasks_project_status_deadline', table_name='tasks')
+    op.drop_index('idx_project_roles_project_id', table_name='project_roles')
+    op.drop_index('idx_project_members_role_id', table_name='project_members')
+    op.drop_index('idx_project_members_user_id', table_name='project_members')
+    op.drop_index('idx_task_assignees_user_id', table_name='task_assignees')
@@ -0,0 +1,24 @@
+"""add member limit to project roles
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Лимит участников динамической роли (NULL = без ограничений)
+    op.add_column('project_roles', sa.Column('max_members', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('project_roles', 'max_members')
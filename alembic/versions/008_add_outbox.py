@@ -0,0 +1,48 @@
+"""add notification outbox
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-16 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Исходящие сообщения: пишутся в одной транзакции с изменением данных,
+    # отправляются диспетчером бота
+    utc_now = sa.text("(now() at time zone 'utc')")
+    op.create_table(
+        'outbox',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('chat_id', sa.BigInteger(), nullable=False),
+        sa.Column('text', sa.Text(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('available_at', sa.DateTime(), nullable=False, server_default=utc_now),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=utc_now),
+        sa.Column('delivered_at', sa.DateTime(), nullable=True),
+        sa.Column('failed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    # Очередь на отправку: только неотправленные строки, в порядке доступности
+    op.create_index(
+        'idx_outbox_pending',
+        'outbox',
+        ['available_at', 'id'],
+        postgresql_where=sa.text('delivered_at IS NULL AND failed_at IS NULL'),
+    )
+    # Очистка отправленных
+    op.create_index('idx_outbox_delivered_at', 'outbox', ['delivered_at'])
+
+
+def downgrade():
+    op.drop_index('idx_outbox_delivered_at', table_name='outbox')
+    op.drop_index('idx_outbox_pending', table_name='outbox')
+    op.drop_table('outbox')
@@ -0,0 +1,106 @@
+"""replace managed_by_role_ids with role hierarchy tables
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-16 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+# Должно совпадать с database.repositories.role.MAX_ROLE_DEPTH
+MAX_ROLE_DEPTH = 64
+
+
+def upgrade():
+    # Прямые связи «кто кем управляет»
+    op.create_table(
+        'project_role_managers',
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('manager_role_id', sa.Integer(), nullable=False),
+        sa.Column('role_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['manager_role_id'], ['project_roles.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['role_id'], ['project_roles.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('manager_role_id', 'role_id')
+    )
+    op.create_index('idx_project_role_managers_role_id', 'project_role_managers', ['role_id'])
+    op.create_index('idx_project_role_managers_project_id', 'project_role_managers', ['project_id'])
+    
+    # Транзитивное замыкание: все пары (старшая роль, подчинённая роль)
+    op.create_table(
+        'project_role_closure',
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('ancestor_id', sa.Integer(), nullable=False),
+        sa.Column('descendant_id', sa.Integer(), nullable=False),
+        sa.Column('depth', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['ancestor_id'], ['project_roles.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['descendant_id'], ['project_roles.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id')
+    )
+    op.create_index('idx_project_role_closure_descendant', 'project_role_closure', ['descendant_id', 'ancestor_id'])
+    op.create_index('idx_project_role_closure_project_id', 'project_role_closure', ['project_id'])
+    
+    # Перенос связей из JSON; значения, не являющиеся массивом чисел, и роли чужих проектов
+    # пропускаются. Проверка стоит в CASE, чтобы приведение к json не вычислялось
+    # для некорректных строк раньше фильтра
+    op.execute(r"""
+        INSERT INTO project_role_managers (project_id, manager_role_id, role_id)
+        SELECT DISTINCT r.project_id, m.id, r.id
+        FROM project_roles r
+        CROSS JOIN LATERAL json_array_elements_text(
+            CASE
+                WHEN r.managed_by_role_ids ~ '^\s*\[\s*(\d{1,9}\s*(,\s*\d{1,9}\s*)*)?\]\s*$'
+                THEN r.managed_by_role_ids::json
+                ELSE '[]'::json
+            END
+        ) AS e(value)
+        JOIN project_roles m ON m.id = e.value::integer AND m.project_id = r.project_id
+        WHERE m.id <> r.id
+    """)
+    
+    op.execute(f"""
+        INSERT INTO project_role_closure (project_id, ancestor_id, descendant_id, depth)
+        WITH RECURSIVE paths (project_id, ancestor_id, descendant_id, depth) AS (
+            SELECT project_id, manager_role_id, role_id, 1
+            FROM project_role_managers
+            UNION ALL
+            SELECT p.project_id, p.ancestor_id, e.role_id, p.depth + 1
+            FROM paths p
+            JOIN project_role_managers e ON e.manager_role_id = p.descendant_id
+            WHERE p.depth < {MAX_ROLE_DEPTH}
+        )
+        SELECT project_id, ancestor_id, descendant_id, min(depth)
+        FROM paths
+        GROUP BY project_id, ancestor_id, descendant_id
+    """)
+    
+    op.drop_column('project_roles', 'managed_by_role_ids')
+
+
+def downgrade():
+    op.add_column('project_roles', sa.Column('managed_by_role_ids', sa.Text(), nullable=True))
+    op.execute("""
+        UPDATE project_roles r
+        SET managed_by_role_ids = m.ids
+        FROM (
+            SELECT role_id, json_agg(manager_role_id ORDER BY manager_role_id)::text AS ids
+            FROM project_role_managers
+            GROUP BY role_id
+        ) m
+        WHERE m.role_id = r.id
+    """)
+    
+    op.drop_index('idx_project_role_closure_project_id', table_name='project_role_closure')
+    op.drop_index('idx_project_role_closure_descendant', table_name='project_role_closure')
+    op.drop_table('project_role_closure')
+    op.drop_index('idx_project_role_managers_project_id', table_name='project_role_managers')
+    op.drop_index('idx_project_role_managers_role_id', table_name='project_role_managers')
+    op.drop_table('project_role_managers')
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Замер стоимости оформления списков задач (bot/utils/presentation.py).
+
+Для каждого размера списка выводится время на одну задачу: при линейной
+сборке сообщений оно не должно расти вместе с размером списка.
+БД и Telegram не нужны — задачи генерируются в памяти.
+
+Использование:
+    python bench_presentation.py
+"""
+
+import os
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+from typing import Callable, List
+
+# bot.utils.presentation импортирует database.models через пакет database,
+# а он читает настройки; БД не используется, хватает заглушки
+os.environ.setdefault("POSTGRES_PASSWORD", "bench")
+
+from bot.utils.presentation import reference_time, render_digest, render_my_tasks, render_project_reminder
+
+SIZES = [100, 1000, 5000, 20000]
+REPEATS = 5
+
+
+def _make_tasks(count: int) -> List[SimpleNamespace]:
+    now = reference_time()
+    project = SimpleNamespace(name="Проект")
+    return [
+        SimpleNamespace(
+            title=f"Задача номер {i}",
+            status="pending",
+            project=project,
+            deadline=None if i % 7 == 0 else now + timedelta(hours=(i % 240) - 48),
+        )
+        for i in range(count)
+    ]
+
+
+def _measure(render: Callable[[], List[str]]) -> float:
+    """Лучшее время из REPEATS запусков, секунды"""
+    best = float("inf")
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        render()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    now = reference_time()
+    print(f"{'задач':>8} {'мои задачи':>14} {'напоминание':>14} {'сводка':>14}   (мкс на задачу)")
+    for size in SIZES:
+        tasks = _make_tasks(size)
+        overdue = [t for t in tasks if t.deadline is not None and t.deadline < now]
+        upcoming = [t for t in tasks if t.deadline is None or t.deadline >= now]
+        projects = {
+            i: {"name": f"Проект {i}", "overdue": overdue[i::10], "upcoming": upcoming[i::10]}
+            for i in range(10)
+        }
+        
+        timings = [
+            _measure(lambda: render_my_tasks(tasks, now)),
+            _measure(lambda: render_project_reminder("Проект", overdue, upcoming, now)),
+            _measure(lambda: render_digest(projects, now)),
+        ]
+        print(f"{size:>8} " + " ".join(f"{t / size * 1e6:>14.2f}" for t in timings))
+
+
+if __name__ == "__main__":
+    main()
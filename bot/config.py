@@ -19,6 +19,54 @@ class Settings(BaseSettings):
     postgres_password: str = Field(..., validation_alias="POSTGRES_PASSWORD")
     postgres_db: str = Field("vshu_bot_db", validation_alias="POSTGRES_DB")
     
+    # Реплика для тяжёлых чтений (пусто — всё читается с основной БД); пользователь, пароль и база те же
+    postgres_replica_host: str = Field("", validation_alias="POSTGRES_REPLICA_HOST")
+    postgres_replica_port: int = Field(5432, validation_alias="POSTGRES_REPLICA_PORT")
+    # Сколько секунд после записи пользователя его чтения идут на основную БД, пока реплика догоняет
+    replica_sticky_seconds: float = Field(10.0, validation_alias="REPLICA_STICKY_SECONDS")
+    
+    # Пул соединений с БД (на процесс)
+    db_pool_size: int = Field(10, validation_alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(20, validation_alias="DB_MAX_OVERFLOW")
+    db_pool_timeout: float = Field(30.0, validation_alias="DB_POOL_TIMEOUT")  # секунд ожидания свободного соединения
+    db_pool_recycle: int = Field(1800, validation_alias="DB_POOL_RECYCLE")  # секунд жизни соединения, -1 — без ограничения
+    db_pool_pre_ping: bool = Field(True, validation_alias="DB_POOL_PRE_PING")  # проверять соединение перед выдачей
+    db_statement_cache_size: int = Field(100, validation_alias="DB_STATEMENT_CACHE_SIZE")  # 0 — для PgBouncer
+    
+    # Отправка сообщений (лимиты Telegram: ~30 сообщений/с на бота)
+    send_concurrency: int = Field(10, validation_alias="SEND_CONCURRENCY")
+    send_rate_limit: float = Field(30.0, validation_alias="SEND_RATE_LIMIT")
+    
+    # Outbox: исходящие сообщения пишутся в БД и отправляются диспетчером бота
+    outbox_dispatcher_enabled: bool = Field(True, validation_alias="OUTBOX_DISPATCHER_ENABLED")
+    outbox_batch_size: int = Field(100, validation_alias="OUTBOX_BATCH_SIZE")
+    outbox_poll_interval: float = Field(1.0, validation_alias="OUTBOX_POLL_INTERVAL")  # секунд между опросами пустой очереди
+    outbox_max_attempts: int = Field(5, validation_alias="OUTBOX_MAX_ATTEMPTS")
+    
+    # Напоминания: одна сводка на пользователя по всем проектам вместо сообщения от каждого
+    reminder_digest: bool = Field(False, validation_alias="REMINDER_DIGEST")
+    
+    # FSM: хранилище состояний диалогов (postgres | memory)
+    fsm_storage: str = Field("postgres", validation_alias="FSM_STORAGE")
+    fsm_state_ttl: int = Field(86400, validation_alias="FSM_STATE_TTL")  # секунд до удаления заброшенного диалога
+    fsm_flush_interval: float = Field(1.0, validation_alias="FSM_FLUSH_INTERVAL")  # 0 — писать сразу, без кэша
+    
+    # Кэш ролей участников проектов для проверки прав, секунд
+    membership_cache_ttl: float = Field(60.0, validation_alias="MEMBERSHIP_CACHE_TTL")
+    
+    # Режим получения обновлений: polling | webhook
+    bot_mode: str = Field("polling", validation_alias="BOT_MODE")
+    webhook_url: str = Field("", validation_alias="WEBHOOK_URL")  # Публичный адрес, например https://bot.example.com
+    webhook_path: str = Field("/telegram/webhook", validation_alias="WEBHOOK_PATH")
+    webhook_secret: str = Field("", validation_alias="WEBHOOK_SECRET")
+    webhook_host: str = Field("0.0.0.0", validation_alias="WEBHOOK_HOST")
+    webhook_port: int = Field(8080, validation_alias="WEBHOOK_PORT")
+    webhook_workers: int = Field(8, validation_alias="WEBHOOK_WORKERS")  # Параллельно обрабатываемых обновлений
+    webhook_queue_size: int = Field(1000, validation_alias="WEBHOOK_QUEUE_SIZE")
+    
+    # Планировщик напоминаний (при нескольких репликах включать только на одной)
+    scheduler_enabled: bool = Field(True, validation_alias="SCHEDULER_ENABLED")
+    
     # Логирование
     log_level: str = Field("INFO", validation_alias="LOG_LEVEL")
     
@@ -26,6 +74,13 @@ class Settings(BaseSettings):
     def database_url(self) -> str:
         return f"postgresql+asyncpg://{self.postgres_user}:{self.postgres_password}@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
     
+    @property
+    def database_replica_url(self) -> str:
+        """URL реплики только для чтения или пустая строка"""
+        if not self.postgres_replica_host:
+            return ""
+        return f"postgresql+asyncpg://{self.postgres_user}:{self.postgres_password}@{self.postgres_replica_host}:{self.postgres_replica_port}/{self.postgres_db}"
+    
     @property
     def database_url_sync(self) -> str:
         """URL для синхронного подключения (для Alembic)"""
@@ -2,37 +2,44 @@ import logging
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.connection import get_db_manager
 from database.repositories import UserRepository, ProjectRepository
-from database.models import RoleType, ROLE_NAMES
+from database.models import RoleType, ROLE_NAMES, User
+from database.permissions import Permission
 from bot.keyboards import (
     get_members_keyboard,
     get_roles_keyboard,
     get_cancel_keyboard,
     get_confirmation_keyboard,
     get_member_actions_keyboard,
+    get_user_choices_keyboard,
 )
 from bot.states import MemberStates
 
 router = Router()
 logger = logging.getLogger(__name__)
 
+# Сколько похожих пользователей предлагать, если точного совпадения нет
+USER_SUGGESTIONS_LIMIT = 5
+
 
 @router.callback_query(F.data.startswith("project:") & F.data.endswith(":members"))
-async def callback_project_members(callback: CallbackQuery):
+async def callback_project_members(callback: CallbackQuery, project_repo: ProjectRepository):
     """Список участников проекта"""
     project_id = int(callback.data.split(":")[1])
     
-    db = get_db_manager()
-    async with db.session() as session:
-        project_repo = ProjectRepository(session)
-        project = await project_repo.get_by_id(project_id)
-        members = await project_repo.get_project_members(project_id)
-        
-        # Проверяем права
-        current_member = await project_repo.get_member(project_id, callback.from_user.id)
-        can_manage = current_member and current_member.role in [RoleType.PROJECTNIK.value, RoleType.MAIN_ORGANIZER.value]
+    project = await project_repo.get_header(project_id)
+    if not project:
+        await callback.answer("❌ Проект не найден", show_alert=True)
+        return
+    
+    members = await project_repo.get_project_members(project_id)
+    
+    # Проверяем права
+    can_manage = await project_repo.has_permission(
+        project_id, callback.from_user.id, Permission.MANAGE_MEMBERS
+    )
     
     text = f"👥 <b>Участники проекта \"{project.name}\":</b>\n\n"
     
@@ -65,28 +72,8 @@ async def callback_add_member(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@router.message(MemberStates.waiting_for_username)
-async def process_member_username(message: Message, state: FSMContext):
-    """Обработка username участника"""
-    username = message.text.strip().lstrip("@")
-    
-    db = get_db_manager()
-    async with db.session() as session:
-        user_repo = UserRepository(session)
-        users = await user_repo.search_by_username(username)
-        
-        if not users:
-            await message.answer(
-                "❌ Пользователь не найден.\n\n"
-                "Убедитесь, что пользователь уже написал боту /start\n"
-                "Введите username еще раз:",
-                reply_markup=get_cancel_keyboard(),
-            )
-            return
-        
-        # Если найдено несколько, берем точное совпадение или первого
-        user = next((u for u in users if u.username and u.username.lower() == username.lower()), users[0])
-    
+async def _ask_member_role(message: Message, state: FSMContext, user: User):
+    """Запомнить выбранного пользователя и перейти к выбору роли"""
     await state.update_data(add_member_user_id=user.telegram_id, add_member_username=user.username)
     await state.set_state(MemberStates.waiting_for_role)
     
@@ -94,15 +81,62 @@ async def process_member_username(message: Message, state: FSMContext):
     project_id = data["add_member_project_id"]
     
     await message.answer(
-        f"✅ Найден пользователь: <b>{user.full_name}</b> (@{user.username})\n\n"
+        f"✅ Пользователь: <b>{user.full_name}</b> (@{user.username})\n\n"
         "Выберите роль для участника:",
         reply_markup=get_roles_keyboard(project_id),
         parse_mode="HTML",
     )
 
 
+@router.message(MemberStates.waiting_for_username)
+async def process_member_username(message: Message, state: FSMContext, user_repo: UserRepository):
+    """Обработка username участника"""
+    username = message.text.strip().lstrip("@")
+    
+    user = await user_repo.get_by_username(username)
+    if user:
+        await _ask_member_role(message, state, user)
+        return
+    
+    # Точного совпадения нет: предлагаем похожих, выбор — за пользователем
+    users = await user_repo.search_by_username(username, limit=USER_SUGGESTIONS_LIMIT)
+    if not users:
+        await message.answer(
+            "❌ Пользователь не найден.\n\n"
+            "Убедитесь, что пользователь уже написал боту /start\n"
+            "Введите username еще раз:",
+            reply_markup=get_cancel_keyboard(),
+        )
+        return
+    
+    await message.answer(
+        f"🔍 Пользователь @{username} не найден. Похожие пользователи — "
+        "выберите нужного или введите username еще раз:",
+        reply_markup=get_user_choices_keyboard(users),
+    )
+
+
+@router.callback_query(F.data.startswith("pick_user:"), MemberStates.waiting_for_username)
+async def callback_pick_member(callback: CallbackQuery, state: FSMContext, user_repo: UserRepository):
+    """Выбор участника из предложенных"""
+    user_id = int(callback.data.split(":")[1])
+    
+    user = await user_repo.get_by_telegram_id(user_id)
+    if not user:
+        await callback.answer("❌ Пользователь не найден", show_alert=True)
+        return
+    
+    await _ask_member_role(callback.message, state, user)
+    await callback.answer()
+
+
 @router.callback_query(F.data.startswith("role:"), MemberStates.waiting_for_role)
-async def callback_select_role(callback: CallbackQuery, state: FSMContext):
+async def callback_select_role(
+    callback: CallbackQuery,
+    state: FSMContext,
+    session: AsyncSession,
+    project_repo: ProjectRepository,
+):
     """Выбор роли для нового участника"""
     parts = callback.data.split(":")
     project_id = int(parts[1])
@@ -117,20 +151,19 @@ async def callback_select_role(callback: CallbackQuery, state: FSMContext):
     data = await state.get_data()
     user_id = data["add_member_user_id"]
     
-    db = get_db_manager()
-    async with db.session() as session:
-        project_repo = ProjectRepository(session)
-        member, error = await project_repo.add_member(project_id, user_id, role)
-        
-        if error:
-            await callback.message.edit_text(
-                f"❌ {error}",
-                reply_markup=get_roles_keyboard(project_id),
-            )
-            await callback.answer()
-            return
-        
-        project = await project_repo.get_by_id(project_id)
+    member, error = await project_repo.add_member(project_id, user_id, role)
+    if not error:
+        members = await project_repo.get_project_members(project_id)
+    # Коммит до ответа в Telegram: блокировка проекта не держится на время запроса к API
+    await session.commit()
+    
+    if error:
+        await callback.message.edit_text(
+            f"❌ {error}",
+            reply_markup=get_roles_keyboard(project_id),
+        )
+        await callback.answer()
+        return
     
     await state.clear()
     logger.info(f"Member {user_id} added to project {project_id} with role {role.value}")
@@ -142,7 +175,7 @@ async def callback_select_role(callback: CallbackQuery, state: FSMContext):
         f"👤 @{data['add_member_username']}\n"
         f"📌 Роль: {role_name}",
         reply_markup=get_members_keyboard(
-            await get_project_members_list(project_id),
+            members,
             project_id,
             can_manage=True,
         ),
@@ -151,29 +184,18 @@ async def callback_select_role(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-async def get_project_members_list(project_id: int):
-    """Вспомогательная функция для получения участников"""
-    db = get_db_manager()
-    async with db.session() as session:
-        project_repo = ProjectRepository(session)
-        return await project_repo.get_project_members(project_id)
-
-
 @router.callback_query(F.data.startswith("member:") & F.data.endswith(":menu"))
-async def callback_member_menu(callback: CallbackQuery):
+async def callback_member_menu(callback: CallbackQuery, project_repo: ProjectRepository):
     """Меню действий с участником"""
     parts = callback.data.split(":")
     project_id = int(parts[1])
     user_id = int(parts[2])
     
-    db = get_db_manager()
-    async with db.session() as session:
-        project_repo = ProjectRepository(session)
-        member = await project_repo.get_member(project_id, user_id)
-        
-        if not member:
-            await callback.answer("❌ Участник не найден", show_alert=True)
-            return
+    member = await project_repo.get_member(project_id, user_id)
+    
+    if not member:
+        await callback.answer("❌ Участник не найден", show_alert=True)
+        return
     
     role_name = ROLE_NAMES.get(member.role, "Участник")
     user_name = member.user.full_name if member.user else "Unknown"
@@ -211,7 +233,12 @@ async def callback_change_member_role(callback: CallbackQuery, state: FSMContext
 
 
 @router.callback_query(F.data.startswith("role:"))
-async def callback_change_role_select(callback: CallbackQuery, state: FSMContext):
+async def callback_change_role_select(
+    callback: CallbackQuery,
+    state: FSMContext,
+    session: AsyncSession,
+    project_repo: ProjectRepository,
+):
     """Выбор новой роли (для изменения)"""
     parts = callback.data.split(":")
     project_id = int(parts[1])
@@ -230,18 +257,19 @@ async def callback_change_role_select(callback: CallbackQuery, state: FSMContext
         await callback.answer("❌ Неверная роль", show_alert=True)
         return
     
-    db = get_db_manager()
-    async with db.session() as session:
-        project_repo = ProjectRepository(session)
-        member, error = await project_repo.change_member_role(project_id, user_id, role)
-        
-        if error:
-            await callback.message.edit_text(
-                f"❌ {error}",
-                reply_markup=get_roles_keyboard(project_id),
-            )
-            await callback.answer()
-            return
+    member, error = await project_repo.change_member_role(project_id, user_id, role)
+    if not error:
+        members = await project_repo.get_project_members(project_id)
+    # Коммит до ответа в Telegram: блокировка проекта не держится на время запроса к API
+    await session.commit()
+    
+    if error:
+        await callback.message.edit_text(
+            f"❌ {error}",
+            reply_markup=get_roles_keyboard(project_id),
+        )
+        await callback.answer()
+        return
     
     await state.clear()
     logger.info(f"Member {user_id} role changed to {role.value} in project {project_id}")
@@ -251,7 +279,7 @@ async def callback_change_role_select(callback: CallbackQuery, state: FSMContext
     await callback.message.edit_text(
         f"✅ Роль изменена на: {role_name}",
         reply_markup=get_members_keyboard(
-            await get_project_members_list(project_id),
+            members,
             project_id,
             can_manage=True,
         ),
@@ -278,23 +306,26 @@ async def callback_remove_member(callback: CallbackQuery):
 
 
 @router.callback_query(F.data.startswith("member:") & F.data.endswith(":confirm_remove"))
-async def callback_confirm_remove_member(callback: CallbackQuery):
+async def callback_confirm_remove_member(
+    callback: CallbackQuery,
+    session: AsyncSession,
+    project_repo: ProjectRepository,
+):
     """Удаление участника"""
     parts = callback.data.split(":")
     project_id = int(parts[1])
     user_id = int(parts[2])
     
-    db = get_db_manager()
-    async with db.session() as session:
-        project_repo = ProjectRepository(session)
-        await project_repo.remove_member(project_id, user_id)
+    await project_repo.remove_member(project_id, user_id)
+    members = await project_repo.get_project_members(project_id)
+    await session.commit()
     
     logger.info(f"Member {user_id} removed from project {project_id}")
     
     await callback.message.edit_text(
         "✅ Участник удален из проекта.",
         reply_markup=get_members_keyboard(
-            await get_project_members_list(project_id),
+            members,
             project_id,
             can_manage=True,
         ),
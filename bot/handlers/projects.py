@@ -2,10 +2,11 @@ import logging
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.connection import get_db_manager
-from database.repositories import UserRepository, ProjectRepository
+from database.repositories import ProjectRepository
 from database.models import RoleType, ROLE_NAMES
+from database.permissions import Permission
 from bot.keyboards import (
     get_projects_keyboard,
     get_project_menu_keyboard,
@@ -13,18 +14,16 @@ from bot.keyboards import (
     get_confirmation_keyboard,
 )
 from bot.states import ProjectStates
+from bot.services import sync_project_reminder, unschedule_project_reminder
 
 router = Router()
 logger = logging.getLogger(__name__)
 
 
 @router.callback_query(F.data == "projects:list")
-async def callback_projects_list(callback: CallbackQuery):
+async def callback_projects_list(callback: CallbackQuery, project_repo: ProjectRepository):
     """Список проектов пользователя"""
-    db = get_db_manager()
-    async with db.session() as session:
-        project_repo = ProjectRepository(session)
-        projects = await project_repo.get_user_projects(callback.from_user.id)
+    projects = await project_repo.get_user_projects(callback.from_user.id)
     
     if projects:
         text = "📁 <b>Ваши проекты:</b>\n\nВыберите проект для просмотра:"
@@ -43,12 +42,9 @@ async def callback_projects_list(callback: CallbackQuery):
 
 
 @router.message(F.text == "/myprojects")
-async def cmd_my_projects(message: Message):
+async def cmd_my_projects(message: Message, project_repo: ProjectRepository):
     """Команда /myprojects"""
-    db = get_db_manager()
-    async with db.session() as session:
-        project_repo = ProjectRepository(session)
-        projects = await project_repo.get_user_projects(message.from_user.id)
+    projects = await project_repo.get_user_projects(message.from_user.id)
     
     if projects:
         text = "📁 <b>Ваши проекты:</b>\n\nВыберите проект для просмотра:"
@@ -113,7 +109,12 @@ async def process_project_name(message: Message, state: FSMContext):
 
 
 @router.message(ProjectStates.waiting_for_description)
-async def process_project_description(message: Message, state: FSMContext):
+async def process_project_description(
+    message: Message,
+    state: FSMContext,
+    session: AsyncSession,
+    project_repo: ProjectRepository,
+):
     """Обработка описания проекта"""
     data = await state.get_data()
     name = data["project_name"]
@@ -122,25 +123,20 @@ async def process_project_description(message: Message, state: FSMContext):
     if message.text.strip() != "-":
         description = message.text.strip()
     
-    db = get_db_manager()
-    async with db.session() as session:
-        user_repo = UserRepository(session)
-        await user_repo.get_or_create(
-            telegram_id=message.from_user.id,
-            username=message.from_user.username,
-            first_name=message.from_user.first_name,
-            last_name=message.from_user.last_name,
-        )
-        
-        project_repo = ProjectRepository(session)
-        project = await project_repo.create(
-            name=name,
-            description=description,
-            created_by=message.from_user.id,
-        )
-        project_id = project.id
+    project = await project_repo.create(
+        name=name,
+        description=description,
+        created_by=message.from_user.id,
+    )
+    project_id = project.id
+    reminders_enabled = project.reminders_enabled
+    reminder_hour = project.reminder_hour
+    reminder_minute = project.reminder_minute
+    # Напоминание планируется и ответ отправляется только для сохранённого проекта
+    await session.commit()
     
     await state.clear()
+    sync_project_reminder(project_id, reminders_enabled, reminder_hour, reminder_minute)
     logger.info(f"Project created: {name} (ID: {project_id}) by user {message.from_user.id}")
     
     text = (
@@ -153,55 +149,48 @@ async def process_project_description(message: Message, state: FSMContext):
     
     await message.answer(
         text,
-        reply_markup=get_project_menu_keyboard(project_id, is_admin=True),
+        reply_markup=get_project_menu_keyboard(project_id, permissions=Permission.ALL),
         parse_mode="HTML",
     )
 
 
 @router.callback_query(F.data.startswith("project:") & F.data.endswith(":menu"))
-async def callback_project_menu(callback: CallbackQuery):
+async def callback_project_menu(callback: CallbackQuery, project_repo: ProjectRepository):
     """Меню проекта"""
     project_id = int(callback.data.split(":")[1])
     
-    db = get_db_manager()
-    async with db.session() as session:
-        project_repo = ProjectRepository(session)
-        project = await project_repo.get_by_id(project_id)
-        
-        if not project:
-            await callback.answer("❌ Проект не найден", show_alert=True)
-            return
-        
-        # Проверяем права (проектник или главный организатор)
-        member = await project_repo.get_member(project_id, callback.from_user.id)
-        is_admin = member and member.role in [RoleType.PROJECTNIK.value, RoleType.MAIN_ORGANIZER.value]
+    project = await project_repo.get_header(project_id)
+    
+    if not project:
+        await callback.answer("❌ Проект не найден", show_alert=True)
+        return
+    
+    # Права пользователя определяют кнопки управления
+    permissions = await project_repo.get_permissions(project_id, callback.from_user.id)
     
     text = f"📁 <b>{project.name}</b>\n"
     if project.description:
         text += f"\n📝 {project.description}\n"
     
-    text += f"\n👥 Участников: {len(project.members)}"
-    text += f"\n📋 Задач: {len(project.tasks)}"
+    text += f"\n👥 Участников: {project.member_count}"
+    text += f"\n📋 Задач: {project.task_count}"
     
     await callback.message.edit_text(
         text,
-        reply_markup=get_project_menu_keyboard(project_id, is_admin=is_admin),
+        reply_markup=get_project_menu_keyboard(project_id, permissions=permissions),
         parse_mode="HTML",
     )
     await callback.answer()
 
 
 @router.callback_query(F.data.startswith("project:") & F.data.endswith(":settings"))
-async def callback_project_settings(callback: CallbackQuery):
+async def callback_project_settings(callback: CallbackQuery, project_repo: ProjectRepository):
     """Настройки проекта"""
     project_id = int(callback.data.split(":")[1])
     
     from bot.keyboards import get_project_settings_keyboard
     
-    db = get_db_manager()
-    async with db.session() as session:
-        project_repo = ProjectRepository(session)
-        project = await project_repo.get_by_id(project_id)
+    project = await project_repo.get_settings(project_id)
     
     reminder_status = "🔔 вкл" if project.reminders_enabled else "🔕 выкл"
     
@@ -233,7 +222,12 @@ async def callback_edit_project_name(callback: CallbackQuery, state: FSMContext)
 
 
 @router.message(ProjectStates.waiting_for_edit_name)
-async def process_edit_project_name(message: Message, state: FSMContext):
+async def process_edit_project_name(
+    message: Message,
+    state: FSMContext,
+    session: AsyncSession,
+    project_repo: ProjectRepository,
+):
     """Обработка нового названия"""
     data = await state.get_data()
     project_id = data["edit_project_id"]
@@ -246,16 +240,15 @@ async def process_edit_project_name(message: Message, state: FSMContext):
         )
         return
     
-    db = get_db_manager()
-    async with db.session() as session:
-        project_repo = ProjectRepository(session)
-        project = await project_repo.update(project_id, name=name)
+    project = await project_repo.update(project_id, name=name)
+    permissions = await project_repo.get_permissions(project_id, message.from_user.id)
+    await session.commit()
     
     await state.clear()
     
     await message.answer(
         f"✅ Название изменено на: <b>{name}</b>",
-        reply_markup=get_project_menu_keyboard(project_id, is_admin=True),
+        reply_markup=get_project_menu_keyboard(project_id, permissions=permissions),
         parse_mode="HTML",
     )
 
@@ -275,23 +268,27 @@ async def callback_edit_project_desc(callback: CallbackQuery, state: FSMContext)
 
 
 @router.message(ProjectStates.waiting_for_edit_description)
-async def process_edit_project_desc(message: Message, state: FSMContext):
+async def process_edit_project_desc(
+    message: Message,
+    state: FSMContext,
+    session: AsyncSession,
+    project_repo: ProjectRepository,
+):
     """Обработка нового описания"""
     data = await state.get_data()
     project_id = data["edit_project_id"]
     
     description = None if message.text.strip() == "-" else message.text.strip()
     
-    db = get_db_manager()
-    async with db.session() as session:
-        project_repo = ProjectRepository(session)
-        await project_repo.update(project_id, description=description)
+    await project_repo.update(project_id, description=description)
+    permissions = await project_repo.get_permissions(project_id, message.from_user.id)
+    await session.commit()
     
     await state.clear()
     
     await message.answer(
         "✅ Описание обновлено!",
-        reply_markup=get_project_menu_keyboard(project_id, is_admin=True),
+        reply_markup=get_project_menu_keyboard(project_id, permissions=permissions),
     )
 
 
@@ -313,15 +310,18 @@ async def callback_delete_project(callback: CallbackQuery):
 
 
 @router.callback_query(F.data.startswith("project:") & F.data.endswith(":confirm_delete"))
-async def callback_confirm_delete_project(callback: CallbackQuery):
+async def callback_confirm_delete_project(
+    callback: CallbackQuery,
+    session: AsyncSession,
+    project_repo: ProjectRepository,
+):
     """Удаление проекта"""
     project_id = int(callback.data.split(":")[1])
     
-    db = get_db_manager()
-    async with db.session() as session:
-        project_repo = ProjectRepository(session)
-        await project_repo.deactivate(project_id)
+    await project_repo.deactivate(project_id)
+    await session.commit()
     
+    unschedule_project_reminder(project_id)
     logger.info(f"Project {project_id} deactivated by user {callback.from_user.id}")
     
     await callback.message.edit_text(
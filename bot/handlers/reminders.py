@@ -2,10 +2,10 @@ import logging
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.connection import get_db_manager
 from database.repositories import ProjectRepository
-from database.models import RoleType
+from database.permissions import Permission
 from bot.keyboards import (
     get_reminders_settings_keyboard,
     get_reminder_time_keyboard,
@@ -13,30 +13,27 @@ from bot.keyboards import (
     get_cancel_keyboard,
 )
 from bot.states import ReminderStates
+from bot.services import sync_project_reminder
 
 router = Router()
 logger = logging.getLogger(__name__)
 
 
 @router.callback_query(F.data.startswith("project:") & F.data.endswith(":reminders"))
-async def callback_reminders_settings(callback: CallbackQuery):
+async def callback_reminders_settings(callback: CallbackQuery, project_repo: ProjectRepository):
     """Настройки напоминаний проекта"""
     project_id = int(callback.data.split(":")[1])
     
-    db = get_db_manager()
-    async with db.session() as session:
-        project_repo = ProjectRepository(session)
-        project = await project_repo.get_by_id(project_id)
-        
-        if not project:
-            await callback.answer("❌ Проект не найден", show_alert=True)
-            return
-        
-        # Проверяем права
-        member = await project_repo.get_member(project_id, callback.from_user.id)
-        if not member or member.role not in [RoleType.PROJECTNIK.value, RoleType.MAIN_ORGANIZER.value]:
-            await callback.answer("❌ Нет доступа к настройкам", show_alert=True)
-            return
+    project = await project_repo.get_settings(project_id)
+    
+    if not project:
+        await callback.answer("❌ Проект не найден", show_alert=True)
+        return
+    
+    # Проверяем права
+    if not await project_repo.has_permission(project_id, callback.from_user.id, Permission.MANAGE_SETTINGS):
+        await callback.answer("❌ Нет доступа к настройкам", show_alert=True)
+        return
     
     status = "✅ включены" if project.reminders_enabled else "❌ выключены"
     
@@ -65,28 +62,29 @@ async def callback_reminders_settings(callback: CallbackQuery):
 
 
 @router.callback_query(F.data.startswith("reminder:") & F.data.endswith(":toggle"))
-async def callback_toggle_reminders(callback: CallbackQuery):
+async def callback_toggle_reminders(
+    callback: CallbackQuery,
+    session: AsyncSession,
+    project_repo: ProjectRepository,
+):
     """Включить/выключить напоминания"""
     project_id = int(callback.data.split(":")[1])
     
-    db = get_db_manager()
-    async with db.session() as session:
-        project_repo = ProjectRepository(session)
-        project = await project_repo.get_by_id(project_id)
-        
-        if not project:
-            await callback.answer("❌ Проект не найден", show_alert=True)
-            return
-        
-        # Переключаем
-        project.reminders_enabled = not project.reminders_enabled
-        
-        # Сохраняем данные для ответа
-        new_status = project.reminders_enabled
-        project_name = project.name
-        reminder_hour = project.reminder_hour
-        reminder_minute = project.reminder_minute
-        reminder_days = project.reminder_days_before
+    # Переключаем
+    project = await project_repo.update_reminder_settings(project_id, toggle=True)
+    
+    if not project:
+        await callback.answer("❌ Проект не найден", show_alert=True)
+        return
+    
+    new_status = project.reminders_enabled
+    project_name = project.name
+    reminder_hour = project.reminder_hour
+    reminder_minute = project.reminder_minute
+    reminder_days = project.reminder_days_before
+    await session.commit()
+    
+    sync_project_reminder(project_id, new_status, reminder_hour, reminder_minute)
     
     status_text = "🔔 Напоминания включены!" if new_status else "🔕 Напоминания выключены"
     await callback.answer(status_text, show_alert=False)
@@ -131,31 +129,30 @@ async def callback_select_reminder_time(callback: CallbackQuery):
 
 
 @router.callback_query(F.data.startswith("reminder:") & F.data.contains(":set_time:"))
-async def callback_set_reminder_time(callback: CallbackQuery):
+async def callback_set_reminder_time(
+    callback: CallbackQuery,
+    session: AsyncSession,
+    project_repo: ProjectRepository,
+):
     """Установка времени напоминаний"""
     parts = callback.data.split(":")
     project_id = int(parts[1])
     hour = int(parts[3])
     minute = int(parts[4])
     
-    db = get_db_manager()
-    async with db.session() as session:
-        project_repo = ProjectRepository(session)
-        project = await project_repo.get_by_id(project_id)
-        
-        if not project:
-            await callback.answer("❌ Проект не найден", show_alert=True)
-            return
-        
-        project.reminder_hour = hour
-        project.reminder_minute = minute
-        
-        # Сохраняем данные для ответа
-        project_name = project.name
-        reminders_enabled = project.reminders_enabled
-        reminder_days = project.reminder_days_before
+    project = await project_repo.update_reminder_settings(project_id, hour=hour, minute=minute)
+    
+    if not project:
+        await callback.answer("❌ Проект не найден", show_alert=True)
+        return
+    
+    project_name = project.name
+    reminders_enabled = project.reminders_enabled
+    reminder_days = project.reminder_days_before
+    await session.commit()
     
     logger.info(f"Project {project_id} reminder time set to {hour:02d}:{minute:02d}")
+    sync_project_reminder(project_id, reminders_enabled, hour, minute)
     await callback.answer(f"✅ Время установлено: {hour:02d}:{minute:02d}", show_alert=False)
     
     status = "✅ включены" if reminders_enabled else "❌ выключены"
@@ -203,7 +200,12 @@ async def callback_custom_reminder_time(callback: CallbackQuery, state: FSMConte
 
 
 @router.message(ReminderStates.waiting_for_custom_time)
-async def process_custom_reminder_time(message: Message, state: FSMContext):
+async def process_custom_reminder_time(
+    message: Message,
+    state: FSMContext,
+    session: AsyncSession,
+    project_repo: ProjectRepository,
+):
     """Обработка введённого времени"""
     data = await state.get_data()
     project_id = data["reminder_project_id"]
@@ -231,26 +233,21 @@ async def process_custom_reminder_time(message: Message, state: FSMContext):
         )
         return
     
-    db = get_db_manager()
-    async with db.session() as session:
-        project_repo = ProjectRepository(session)
-        project = await project_repo.get_by_id(project_id)
-        
-        if not project:
-            await message.answer("❌ Проект не найден")
-            await state.clear()
-            return
-        
-        project.reminder_hour = hour
-        project.reminder_minute = minute
-        
-        # Сохраняем данные для ответа
-        project_name = project.name
-        reminders_enabled = project.reminders_enabled
-        reminder_days = project.reminder_days_before
+    project = await project_repo.update_reminder_settings(project_id, hour=hour, minute=minute)
+    
+    if not project:
+        await message.answer("❌ Проект не найден")
+        await state.clear()
+        return
+    
+    project_name = project.name
+    reminders_enabled = project.reminders_enabled
+    reminder_days = project.reminder_days_before
+    await session.commit()
     
     await state.clear()
     logger.info(f"Project {project_id} reminder time set to {hour:02d}:{minute:02d}")
+    sync_project_reminder(project_id, reminders_enabled, hour, minute)
     
     status = "✅ включены" if reminders_enabled else "❌ выключены"
     
@@ -293,28 +290,27 @@ async def callback_select_reminder_days(callback: CallbackQuery):
 
 
 @router.callback_query(F.data.startswith("reminder:") & F.data.contains(":set_days:"))
-async def callback_set_reminder_days(callback: CallbackQuery):
+async def callback_set_reminder_days(
+    callback: CallbackQuery,
+    session: AsyncSession,
+    project_repo: ProjectRepository,
+):
     """Установка дней напоминания"""
     parts = callback.data.split(":")
     project_id = int(parts[1])
     days = int(parts[3])
     
-    db = get_db_manager()
-    async with db.session() as session:
-        project_repo = ProjectRepository(session)
-        project = await project_repo.get_by_id(project_id)
-        
-        if not project:
-            await callback.answer("❌ Проект не найден", show_alert=True)
-            return
-        
-        project.reminder_days_before = days
-        
-        # Сохраняем данные для ответа
-        project_name = project.name
-        reminders_enabled = project.reminders_enabled
-        reminder_hour = project.reminder_hour
-        reminder_minute = project.reminder_minute
+    project = await project_repo.update_reminder_settings(project_id, days_before=days)
+    
+    if not project:
+        await callback.answer("❌ Проект не найден", show_alert=True)
+        return
+    
+    project_name = project.name
+    reminders_enabled = project.reminders_enabled
+    reminder_hour = project.reminder_hour
+    reminder_minute = project.reminder_minute
+    await session.commit()
     
     logger.info(f"Project {project_id} reminder days set to {days}")
     
@@ -4,8 +4,6 @@ from aiogram.filters import CommandStart, Command
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 
-from database.connection import get_db_manager
-from database.repositories import UserRepository
 from bot.keyboards import get_main_menu_keyboard
 
 router = Router()
@@ -15,21 +13,9 @@ logger = logging.getLogger(__name__)
 @router.message(CommandStart())
 async def cmd_start(message: Message, state: FSMContext):
     """Обработка команды /start"""
+    # Пользователь уже сохранён в БД через UserSyncMiddleware
     await state.clear()
     
-    db = get_db_manager()
-    async with db.session() as session:
-        user_repo = UserRepository(session)
-        user, created = await user_repo.get_or_create(
-            telegram_id=message.from_user.id,
-            username=message.from_user.username,
-            first_name=message.from_user.first_name,
-            last_name=message.from_user.last_name,
-        )
-        
-        if created:
-            logger.info(f"New user registered: {user.telegram_id} ({user.full_name})")
-    
     welcome_text = (
         f"👋 Привет, <b>{message.from_user.first_name}</b>!\n\n"
         "🎯 Я бот для управления проектной деятельностью ССт ВШУ.\n\n"
@@ -1,11 +1,16 @@
 import logging
+from typing import List, Optional, Tuple
+
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup
 from aiogram.fsm.context import FSMContext
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.connection import get_db_manager
 from database.repositories import ProjectRepository, TaskRepository
-from database.models import TaskStatus, RoleType
+from database.repositories.task import TaskCursor, TaskPage
+from database.models import Task, TaskStatus
+from database.permissions import Permission
 from bot.keyboards import (
     get_tasks_keyboard,
     get_task_menu_keyboard,
@@ -16,168 +21,110 @@ from bot.keyboards import (
     get_main_menu_keyboard,
 )
 from bot.states import TaskStates
-from bot.utils import moscow_now, format_datetime, parse_datetime
+from bot.utils import format_datetime, parse_datetime
+from bot.utils.presentation import STATUS_NAMES, render_my_tasks
 from bot.utils.telegram import safe_edit_text
+from bot.utils.pagination import pack_cursor, unpack_cursor
 
 router = Router()
 logger = logging.getLogger(__name__)
 
 
-STATUS_NAMES = {
-    TaskStatus.PENDING.value: "⏳ Ожидает",
-    TaskStatus.IN_PROGRESS.value: "🔄 В работе",
-    TaskStatus.COMPLETED.value: "✅ Выполнено",
-    TaskStatus.DELAYED.value: "⚠️ Задерживается",
-    TaskStatus.NOT_COMPLETED.value: "❌ Не выполнено",
-}
+def _page_callbacks(prefix: str, page: TaskPage) -> Tuple[Optional[str], Optional[str]]:
+    """callback_data кнопок «назад» и «вперёд» для страницы"""
+    prev_callback = f"{prefix}:p:{pack_cursor(page.prev_cursor)}" if page.prev_cursor else None
+    next_callback = f"{prefix}:n:{pack_cursor(page.next_cursor)}" if page.next_cursor else None
+    return prev_callback, next_callback
 
 
-@router.callback_query(F.data == "tasks:my")
-async def callback_my_tasks(callback: CallbackQuery):
-    """Мои задачи"""
-    from datetime import datetime
-    
+async def _my_tasks_view(
+    user_id: int,
+    cursor: Optional[TaskCursor] = None,
+    backward: bool = False,
+) -> Tuple[str, InlineKeyboardMarkup]:
+    """Страница «Мои задачи»: текст и клавиатура"""
     db = get_db_manager()
-    async with db.session() as session:
+    async with db.read_session(user_id=user_id) as session:
         task_repo = TaskRepository(session)
-        tasks = await task_repo.get_user_tasks(
-            callback.from_user.id,
-            status=None,  # Все статусы кроме завершенных
-        )
-        # Фильтруем завершенные
-        tasks = [t for t in tasks if t.status != TaskStatus.COMPLETED.value]
-    
-    if tasks:
-        text = "📋 <b>Ваши активные задачи</b>\n"
-        text += "━━━━━━━━━━━━━━━━━━━━\n\n"
-        
-        # Сортируем задачи: сначала просроченные, потом по дедлайну
-        now = moscow_now().replace(tzinfo=None)
-        sorted_tasks = sorted(
-            tasks,
-            key=lambda t: (
-                0 if (t.deadline and t.deadline.replace(tzinfo=None) < now) else 1,
-                t.deadline.replace(tzinfo=None) if t.deadline else datetime.max.replace(tzinfo=None)
-            )
-        )
+        page = await task_repo.get_user_tasks_page(user_id, cursor=cursor, backward=backward)
+    
+    if not page.tasks:
+        return "📋 <b>У вас нет активных задач</b>\n\n🎉 Отличная работа!", get_main_menu_keyboard()
+    
+    # Страница ограничена TASKS_PAGE_SIZE задачами и почти всегда помещается в одно
+    # сообщение; если нет — показываем первую часть, остальное доступно по кнопкам задач
+    text = render_my_tasks(page.tasks)[0]
+    prev_callback, next_callback = _page_callbacks("mytasks", page)
+    return text, get_my_tasks_keyboard(
+        page.tasks,
+        prev_callback=prev_callback,
+        next_callback=next_callback,
+    )
+
+
+async def _project_tasks_view(
+    project_id: int,
+    user_id: int,
+    cursor: Optional[TaskCursor] = None,
+    backward: bool = False,
+) -> Tuple[str, InlineKeyboardMarkup]:
+    """Страница задач проекта для пользователя user_id: текст и клавиатура"""
+    db = get_db_manager()
+    async with db.read_session(user_id=user_id) as session:
+        project_repo = ProjectRepository(session)
+        project = await project_repo.get_header(project_id)
+        if not project:
+            return "❌ Проект не найден", get_main_menu_keyboard()
         
-        for i, task in enumerate(sorted_tasks, 1):
-            status = STATUS_NAMES.get(task.status, "?")
-            project_name = task.project.name if task.project else "?"
-            
-            # Определяем срочность
-            urgency_emoji = ""
-            deadline_text = ""
-            
-            if task.deadline:
-                deadline_naive = task.deadline.replace(tzinfo=None) if task.deadline.tzinfo else task.deadline
-                days_left = (deadline_naive - now).days
-                hours_left = (deadline_naive - now).total_seconds() / 3600
-                
-                if days_left < 0:
-                    urgency_emoji = "🔴"
-                    deadline_text = f"⚠️ Просрочено на {abs(days_left)} дн."
-                elif hours_left <= 24:
-                    urgency_emoji = "🔴"
-                    if hours_left < 1:
-                        deadline_text = "⚠️ Менее часа!"
-                    else:
-                        deadline_text = f"⚠️ Через {int(hours_left)} ч."
-                elif days_left <= 1:
-                    urgency_emoji = "🔴"
-                    deadline_text = "⚠️ Завтра!"
-                elif days_left <= 2:
-                    urgency_emoji = "🟡"
-                    deadline_text = f"📅 Через {days_left} дн."
-                else:
-                    urgency_emoji = "🟢"
-                    deadline_text = f"📅 Через {days_left} дн."
-                
-                deadline_text = f"\n   {deadline_text} | DDL: {format_datetime(task.deadline, with_year=True)}"
-            
-            text += f"{urgency_emoji} <b>{i}. {task.title}</b>\n"
-            text += f"   {status} | 📁 {project_name}{deadline_text}\n\n"
+        task_repo = TaskRepository(session)
+        page = await task_repo.get_project_tasks_page(project_id, cursor=cursor, backward=backward)
+    
+    if page.tasks:
+        text = f"📋 <b>Задачи проекта \"{project.name}\":</b>\n\n"
     else:
-        text = "📋 <b>У вас нет активных задач</b>\n\n🎉 Отличная работа!"
+        text = f"📋 <b>В проекте \"{project.name}\" пока нет задач</b>\n\nСоздайте первую задачу!"
     
-    await safe_edit_text(
-        callback,
-        text,
-        reply_markup=get_my_tasks_keyboard(tasks) if tasks else get_main_menu_keyboard(),
+    prev_callback, next_callback = _page_callbacks(f"ptasks:{project_id}", page)
+    return text, get_tasks_keyboard(
+        page.tasks,
+        project_id=project_id,
+        prev_callback=prev_callback,
+        next_callback=next_callback,
+    )
+
+
+@router.callback_query(F.data == "tasks:my")
+async def callback_my_tasks(callback: CallbackQuery):
+    """Мои задачи"""
+    text, reply_markup = await _my_tasks_view(callback.from_user.id)
+    
+    await safe_edit_text(callback, text, reply_markup=reply_markup)
+    await callback.answer()
+
+
+@router.callback_query(F.data.startswith("mytasks:"))
+async def callback_my_tasks_page(callback: CallbackQuery):
+    """Переход по страницам «Мои задачи»"""
+    _, direction, cursor = callback.data.split(":", 2)
+    
+    text, reply_markup = await _my_tasks_view(
+        callback.from_user.id,
+        cursor=unpack_cursor(cursor),
+        backward=direction == "p",
     )
+    
+    await safe_edit_text(callback, text, reply_markup=reply_markup)
     await callback.answer()
 
 
 @router.message(F.text == "/mytasks")
 async def cmd_my_tasks(message: Message):
     """Команда /mytasks"""
-    from datetime import datetime
-    
-    db = get_db_manager()
-    async with db.session() as session:
-        task_repo = TaskRepository(session)
-        tasks = await task_repo.get_user_tasks(
-            message.from_user.id,
-            status=None,
-        )
-        tasks = [t for t in tasks if t.status != TaskStatus.COMPLETED.value]
-    
-    if tasks:
-        text = "📋 <b>Ваши активные задачи</b>\n"
-        text += "━━━━━━━━━━━━━━━━━━━━\n\n"
-        
-        # Сортируем задачи: сначала просроченные, потом по дедлайну
-        now = moscow_now().replace(tzinfo=None)
-        sorted_tasks = sorted(
-            tasks,
-            key=lambda t: (
-                0 if (t.deadline and t.deadline.replace(tzinfo=None) < now) else 1,
-                t.deadline.replace(tzinfo=None) if t.deadline else datetime.max.replace(tzinfo=None)
-            )
-        )
-        
-        for i, task in enumerate(sorted_tasks, 1):
-            status = STATUS_NAMES.get(task.status, "?")
-            project_name = task.project.name if task.project else "?"
-            
-            # Определяем срочность
-            urgency_emoji = ""
-            deadline_text = ""
-            
-            if task.deadline:
-                deadline_naive = task.deadline.replace(tzinfo=None) if task.deadline.tzinfo else task.deadline
-                days_left = (deadline_naive - now).days
-                hours_left = (deadline_naive - now).total_seconds() / 3600
-                
-                if days_left < 0:
-                    urgency_emoji = "🔴"
-                    deadline_text = f"⚠️ Просрочено на {abs(days_left)} дн."
-                elif hours_left <= 24:
-                    urgency_emoji = "🔴"
-                    if hours_left < 1:
-                        deadline_text = "⚠️ Менее часа!"
-                    else:
-                        deadline_text = f"⚠️ Через {int(hours_left)} ч."
-                elif days_left <= 1:
-                    urgency_emoji = "🔴"
-                    deadline_text = "⚠️ Завтра!"
-                elif days_left <= 2:
-                    urgency_emoji = "🟡"
-                    deadline_text = f"📅 Через {days_left} дн."
-                else:
-                    urgency_emoji = "🟢"
-                    deadline_text = f"📅 Через {days_left} дн."
-                
-                deadline_text = f"\n   {deadline_text} | DDL: {format_datetime(task.deadline, with_year=True)}"
-            
-            text += f"{urgency_emoji} <b>{i}. {task.title}</b>\n"
-            text += f"   {status} | 📁 {project_name}{deadline_text}\n\n"
-    else:
-        text = "📋 <b>У вас нет активных задач</b>\n\n🎉 Отличная работа!"
+    text, reply_markup = await _my_tasks_view(message.from_user.id)
     
     await message.answer(
         text,
-        reply_markup=get_my_tasks_keyboard(tasks) if tasks else get_main_menu_keyboard(),
+        reply_markup=reply_markup,
         parse_mode="HTML",
     )
 
@@ -187,27 +134,62 @@ async def callback_project_tasks(callback: CallbackQuery):
     """Задачи проекта"""
     project_id = int(callback.data.split(":")[1])
     
-    db = get_db_manager()
-    async with db.session() as session:
-        project_repo = ProjectRepository(session)
-        project = await project_repo.get_by_id(project_id)
-        
-        task_repo = TaskRepository(session)
-        tasks = await task_repo.get_project_tasks(project_id)
-    
-    if tasks:
-        text = f"📋 <b>Задачи проекта \"{project.name}\":</b>\n\n"
-    else:
-        text = f"📋 <b>В проекте \"{project.name}\" пока нет задач</b>\n\nСоздайте первую задачу!"
+    text, reply_markup = await _project_tasks_view(project_id, callback.from_user.id)
     
     await callback.message.edit_text(
         text,
-        reply_markup=get_tasks_keyboard(tasks, project_id=project_id),
+        reply_markup=reply_markup,
         parse_mode="HTML",
     )
     await callback.answer()
 
 
+@router.callback_query(F.data.startswith("ptasks:"))
+async def callback_project_tasks_page(callback: CallbackQuery):
+    """Переход по страницам задач проекта"""
+    _, project_id, direction, cursor = callback.data.split(":", 3)
+    
+    text, reply_markup = await _project_tasks_view(
+        int(project_id),
+        callback.from_user.id,
+        cursor=unpack_cursor(cursor),
+        backward=direction == "p",
+    )
+    
+    await safe_edit_text(callback, text, reply_markup=reply_markup)
+    await callback.answer()
+
+
+async def _assignee_choices(
+    state: FSMContext,
+    project_repo: ProjectRepository,
+    project_id: int,
+    refresh: bool = False,
+) -> List[Tuple[int, str]]:
+    """
+    Участники проекта для выбора ответственных.
+    
+    Список загружается при открытии выбора и хранится в данных диалога,
+    поэтому переключения перерисовывают клавиатуру без запросов к БД.
+    """
+    if not refresh:
+        choices = (await state.get_data()).get("assignee_choices")
+        if choices is not None:
+            return choices
+    
+    choices = await project_repo.get_member_choices(project_id)
+    
+    await state.update_data(assignee_choices=choices)
+    return choices
+
+
+def _dropped_assignees_note(dropped: int) -> str:
+    """Предупреждение о выбранных, которые покинули проект, пока открыт выбор"""
+    if not dropped:
+        return ""
+    return f"⚠️ Не назначены (больше не участники проекта): {dropped}\n"
+
+
 @router.callback_query(F.data.startswith("project:") & F.data.endswith(":create_task"))
 async def callback_create_task(callback: CallbackQuery, state: FSMContext):
     """Начало создания задачи"""
@@ -271,7 +253,11 @@ async def process_task_description(message: Message, state: FSMContext):
 
 
 @router.message(TaskStates.waiting_for_deadline)
-async def process_task_deadline(message: Message, state: FSMContext):
+async def process_task_deadline(
+    message: Message,
+    state: FSMContext,
+    project_repo: ProjectRepository,
+):
     """Обработка дедлайна"""
     deadline = None
     
@@ -290,14 +276,9 @@ async def process_task_deadline(message: Message, state: FSMContext):
     await state.update_data(task_deadline=deadline)
     await state.set_state(TaskStates.waiting_for_assignees)
     
-    # Получаем участников проекта
     data = await state.get_data()
     project_id = data["task_project_id"]
-    
-    db = get_db_manager()
-    async with db.session() as session:
-        project_repo = ProjectRepository(session)
-        members = await project_repo.get_project_members(project_id)
+    members = await _assignee_choices(state, project_repo, project_id, refresh=True)
     
     await message.answer(
         "👥 <b>Выберите ответственных за задачу:</b>\n\n"
@@ -313,7 +294,11 @@ async def process_task_deadline(message: Message, state: FSMContext):
 
 
 @router.callback_query(F.data.startswith("select_assignee:"), TaskStates.waiting_for_assignees)
-async def callback_select_assignee(callback: CallbackQuery, state: FSMContext):
+async def callback_select_assignee(
+    callback: CallbackQuery,
+    state: FSMContext,
+    project_repo: ProjectRepository,
+):
     """Выбор ответственного"""
     user_id = int(callback.data.split(":")[1])
     
@@ -328,11 +313,7 @@ async def callback_select_assignee(callback: CallbackQuery, state: FSMContext):
     await state.update_data(task_assignees=assignees)
     
     project_id = data["task_project_id"]
-    
-    db = get_db_manager()
-    async with db.session() as session:
-        project_repo = ProjectRepository(session)
-        members = await project_repo.get_project_members(project_id)
+    members = await _assignee_choices(state, project_repo, project_id)
     
     await callback.message.edit_reply_markup(
         reply_markup=get_assignees_selection_keyboard(
@@ -345,7 +326,13 @@ async def callback_select_assignee(callback: CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(F.data == "confirm_assignees", TaskStates.waiting_for_assignees)
-async def callback_confirm_assignees(callback: CallbackQuery, state: FSMContext):
+async def callback_confirm_assignees(
+    callback: CallbackQuery,
+    state: FSMContext,
+    session: AsyncSession,
+    project_repo: ProjectRepository,
+    task_repo: TaskRepository,
+):
     """Подтверждение выбора ответственных и создание задачи"""
     data = await state.get_data()
     
@@ -355,18 +342,21 @@ async def callback_confirm_assignees(callback: CallbackQuery, state: FSMContext)
     deadline = data.get("task_deadline")
     assignees = data.get("task_assignees", [])
     
-    db = get_db_manager()
-    async with db.session() as session:
-        task_repo = TaskRepository(session)
-        task = await task_repo.create(
-            project_id=project_id,
-            title=title,
-            description=description,
-            deadline=deadline,
-            created_by=callback.from_user.id,
-            assignee_ids=assignees if assignees else None,
-        )
-        task_id = task.id
+    # Снимок участников мог устареть: назначаем только текущих
+    members = await project_repo.filter_members(project_id, assignees)
+    dropped = len(set(assignees) - members)
+    assignees = [user_id for user_id in assignees if user_id in members]
+    
+    task = await task_repo.create(
+        project_id=project_id,
+        title=title,
+        description=description,
+        deadline=deadline,
+        created_by=callback.from_user.id,
+        assignee_ids=assignees if assignees else None,
+    )
+    task_id = task.id
+    await session.commit()
     
     await state.clear()
     logger.info(f"Task created: {title} (ID: {task_id}) in project {project_id}")
@@ -377,7 +367,8 @@ async def callback_confirm_assignees(callback: CallbackQuery, state: FSMContext)
         text += f"📝 {description}\n"
     if deadline:
         text += f"📅 DDL: {format_datetime(deadline, with_year=True)} (МСК)\n"
-    text += f"👥 Ответственных: {len(assignees)}"
+    text += f"👥 Ответственных: {len(assignees)}\n"
+    text += _dropped_assignees_note(dropped)
     
     await callback.message.edit_text(
         text,
@@ -391,22 +382,23 @@ async def callback_confirm_assignees(callback: CallbackQuery, state: FSMContext)
 
 
 @router.callback_query(F.data.startswith("task:") & F.data.endswith(":menu"))
-async def callback_task_menu(callback: CallbackQuery):
+async def callback_task_menu(
+    callback: CallbackQuery,
+    task_repo: TaskRepository,
+    project_repo: ProjectRepository,
+):
     """Меню задачи"""
     task_id = int(callback.data.split(":")[1])
     
-    db = get_db_manager()
-    async with db.session() as session:
-        task_repo = TaskRepository(session)
-        task = await task_repo.get_by_id(task_id)
-        
-        if not task:
-            await callback.answer("❌ Задача не найдена", show_alert=True)
-            return
-        
-        project_repo = ProjectRepository(session)
-        member = await project_repo.get_member(task.project_id, callback.from_user.id)
-        can_edit = member and member.role in [RoleType.PROJECTNIK.value, RoleType.MAIN_ORGANIZER.value]
+    task = await task_repo.get_by_id(task_id)
+    
+    if not task:
+        await callback.answer("❌ Задача не найдена", show_alert=True)
+        return
+    
+    can_edit = await project_repo.has_permission(
+        task.project_id, callback.from_user.id, Permission.MANAGE_TASKS
+    )
     
     status = STATUS_NAMES.get(task.status, "?")
     
@@ -448,7 +440,12 @@ async def callback_change_task_status(callback: CallbackQuery):
 
 
 @router.callback_query(F.data.startswith("task:") & F.data.contains(":status:"))
-async def callback_set_task_status(callback: CallbackQuery):
+async def callback_set_task_status(
+    callback: CallbackQuery,
+    session: AsyncSession,
+    task_repo: TaskRepository,
+    project_repo: ProjectRepository,
+):
     """Установка статуса задачи"""
     parts = callback.data.split(":")
     task_id = int(parts[1])
@@ -460,18 +457,16 @@ async def callback_set_task_status(callback: CallbackQuery):
         await callback.answer("❌ Неверный статус", show_alert=True)
         return
     
-    db = get_db_manager()
-    async with db.session() as session:
-        task_repo = TaskRepository(session)
-        task = await task_repo.update_status(task_id, new_status)
-        
-        if not task:
-            await callback.answer("❌ Задача не найдена", show_alert=True)
-            return
-        
-        project_repo = ProjectRepository(session)
-        member = await project_repo.get_member(task.project_id, callback.from_user.id)
-        can_edit = member and member.role in [RoleType.PROJECTNIK.value, RoleType.MAIN_ORGANIZER.value]
+    task = await task_repo.update_status(task_id, new_status)
+    
+    if not task:
+        await callback.answer("❌ Задача не найдена", show_alert=True)
+        return
+    
+    can_edit = await project_repo.has_permission(
+        task.project_id, callback.from_user.id, Permission.MANAGE_TASKS
+    )
+    await session.commit()
     
     logger.info(f"Task {task_id} status changed to {new_status.value} by user {callback.from_user.id}")
     
@@ -510,16 +505,18 @@ async def callback_delete_task(callback: CallbackQuery):
 
 
 @router.callback_query(F.data.startswith("task:") & F.data.endswith(":confirm_delete"))
-async def callback_confirm_delete_task(callback: CallbackQuery):
+async def callback_confirm_delete_task(
+    callback: CallbackQuery,
+    session: AsyncSession,
+    task_repo: TaskRepository,
+):
     """Удаление задачи"""
     task_id = int(callback.data.split(":")[1])
     
-    db = get_db_manager()
-    async with db.session() as session:
-        task_repo = TaskRepository(session)
-        task = await task_repo.get_by_id(task_id)
-        project_id = task.project_id if task else None
-        await task_repo.delete(task_id)
+    task = await task_repo.get_by_id(task_id)
+    project_id = task.project_id if task else None
+    await task_repo.delete(task_id)
+    await session.commit()
     
     logger.info(f"Task {task_id} deleted by user {callback.from_user.id}")
     
@@ -587,7 +584,12 @@ async def process_edit_task_description(message: Message, state: FSMContext):
 
 
 @router.message(TaskStates.waiting_for_edit_deadline)
-async def process_edit_task_deadline(message: Message, state: FSMContext):
+async def process_edit_task_deadline(
+    message: Message,
+    state: FSMContext,
+    session: AsyncSession,
+    task_repo: TaskRepository,
+):
     """Обработка нового дедлайна и сохранение"""
     data = await state.get_data()
     task_id = data["edit_task_id"]
@@ -607,21 +609,18 @@ async def process_edit_task_deadline(message: Message, state: FSMContext):
             )
             return
     
-    db = get_db_manager()
-    async with db.session() as session:
-        task_repo = TaskRepository(session)
-        
-        title = data.get("edit_task_title")
-        description = data.get("edit_task_description")
-        
-        # Если пользователь ввёл '-', не меняем дедлайн (передаём None)
-        # Если ввёл дату, передаём new_deadline
-        task = await task_repo.update(
-            task_id=task_id,
-            title=title,
-            description=description,
-            deadline=new_deadline if not skip_deadline else None,
-        )
+    title = data.get("edit_task_title")
+    description = data.get("edit_task_description")
+    
+    # Если пользователь ввёл '-', не меняем дедлайн (передаём None)
+    # Если ввёл дату, передаём new_deadline
+    task = await task_repo.update(
+        task_id=task_id,
+        title=title,
+        description=description,
+        deadline=new_deadline if not skip_deadline else None,
+    )
+    await session.commit()
     
     await state.clear()
     
@@ -632,20 +631,20 @@ async def process_edit_task_deadline(message: Message, state: FSMContext):
 
 
 @router.callback_query(F.data.startswith("task:") & F.data.endswith(":assignees"))
-async def callback_task_assignees(callback: CallbackQuery, state: FSMContext):
+async def callback_task_assignees(
+    callback: CallbackQuery,
+    state: FSMContext,
+    task_repo: TaskRepository,
+    project_repo: ProjectRepository,
+):
     """Управление ответственными"""
     task_id = int(callback.data.split(":")[1])
     
-    db = get_db_manager()
-    async with db.session() as session:
-        task_repo = TaskRepository(session)
-        task = await task_repo.get_by_id(task_id)
-        
-        project_repo = ProjectRepository(session)
-        members = await project_repo.get_project_members(task.project_id)
-        
-        current_assignees = [a.user_id for a in task.assignees]
+    task = await task_repo.get_by_id(task_id)
+    
+    current_assignees = [a.user_id for a in task.assignees]
     
+    members = await _assignee_choices(state, project_repo, task.project_id, refresh=True)
     await state.update_data(
         edit_task_id=task_id,
         task_project_id=task.project_id,
@@ -667,7 +666,11 @@ async def callback_task_assignees(callback: CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(F.data.startswith("select_assignee:"))
-async def callback_toggle_assignee(callback: CallbackQuery, state: FSMContext):
+async def callback_toggle_assignee(
+    callback: CallbackQuery,
+    state: FSMContext,
+    project_repo: ProjectRepository,
+):
     """Переключение ответственного (вне состояния создания)"""
     user_id = int(callback.data.split(":")[1])
     
@@ -683,10 +686,7 @@ async def callback_toggle_assignee(callback: CallbackQuery, state: FSMContext):
     
     await state.update_data(task_assignees=assignees)
     
-    db = get_db_manager()
-    async with db.session() as session:
-        project_repo = ProjectRepository(session)
-        members = await project_repo.get_project_members(project_id)
+    members = await _assignee_choices(state, project_repo, project_id)
     
     await callback.message.edit_reply_markup(
         reply_markup=get_assignees_selection_keyboard(
@@ -700,35 +700,34 @@ async def callback_toggle_assignee(callback: CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(F.data.startswith("task:") & F.data.endswith(":save_assignees"))
-async def callback_save_assignees(callback: CallbackQuery, state: FSMContext):
+async def callback_save_assignees(
+    callback: CallbackQuery,
+    state: FSMContext,
+    session: AsyncSession,
+    task_repo: TaskRepository,
+    project_repo: ProjectRepository,
+):
     """Сохранение ответственных"""
     task_id = int(callback.data.split(":")[1])
     
     data = await state.get_data()
-    new_assignees = set(data.get("task_assignees", []))
+    project_id = data.get("task_project_id")
+    assignees = data.get("task_assignees", [])
     
-    db = get_db_manager()
-    async with db.session() as session:
-        task_repo = TaskRepository(session)
-        task = await task_repo.get_by_id(task_id)
-        
-        current_assignees = set(a.user_id for a in task.assignees)
-        
-        # Удаляем тех, кого убрали
-        for user_id in current_assignees - new_assignees:
-            await task_repo.remove_assignee(task_id, user_id)
-        
-        # Добавляем новых
-        for user_id in new_assignees - current_assignees:
-            await task_repo.add_assignee(task_id, user_id)
-        
-        # Перезагружаем задачу
+    if project_id is None:
         task = await task_repo.get_by_id(task_id)
+        project_id = task.project_id
+    
+    # Снимок участников мог устареть: назначаем только текущих
+    members = await project_repo.filter_members(project_id, assignees)
+    await task_repo.set_assignees(task_id, members)
+    await session.commit()
     
     await state.clear()
     
     await callback.message.edit_text(
-        "✅ Ответственные обновлены!",
-        reply_markup=get_task_menu_keyboard(task, can_edit=True),
+        "✅ Ответственные обновлены!\n"
+        + _dropped_assignees_note(len(set(assignees) - members)),
+        reply_markup=get_task_menu_keyboard(Task(id=task_id, project_id=project_id), can_edit=True),
     )
     await callback.answer()
@@ -12,6 +12,7 @@ from bot.keyboards.inline import (
     get_confirmation_keyboard,
     get_back_keyboard,
     get_cancel_keyboard,
+    get_user_choices_keyboard,
     get_reminders_settings_keyboard,
     get_reminder_time_keyboard,
     get_reminder_days_keyboard,
@@ -33,6 +34,7 @@ __all__ = [
     "get_confirmation_keyboard",
     "get_back_keyboard",
     "get_cancel_keyboard",
+    "get_user_choices_keyboard",
     "get_reminders_settings_keyboard",
     "get_reminder_time_keyboard",
     "get_reminder_days_keyboard",
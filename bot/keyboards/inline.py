@@ -1,8 +1,9 @@
-from typing import List, Optional
+from typing import List, Optional, Sequence, Tuple
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from database.models import Project, Task, RoleType, TaskStatus, ROLE_NAMES, ProjectMember
+from database.models import Project, Task, RoleType, TaskStatus, ROLE_NAMES, ProjectMember, User
+from database.permissions import Permission
 from bot.utils.timezone import format_datetime
 
 
@@ -49,9 +50,9 @@ def get_projects_keyboard(
 
 def get_project_menu_keyboard(
     project_id: int,
-    is_admin: bool = False,
+    permissions: int = Permission.NONE,
 ) -> InlineKeyboardMarkup:
-    """Меню проекта"""
+    """Меню проекта. Кнопки управления показываются по правам пользователя"""
     builder = InlineKeyboardBuilder()
     
     builder.row(
@@ -73,13 +74,14 @@ def get_project_menu_keyboard(
         ),
     )
     
-    if is_admin:
+    if permissions & Permission.MANAGE_MEMBERS:
         builder.row(
             InlineKeyboardButton(
                 text="👤 Добавить участника",
                 callback_data=f"project:{project_id}:add_member",
             ),
         )
+    if permissions & Permission.MANAGE_SETTINGS:
         builder.row(
             InlineKeyboardButton(
                 text="⚙️ Настройки",
@@ -114,12 +116,29 @@ def get_roles_keyboard(project_id: int) -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+def _add_page_buttons(
+    builder: InlineKeyboardBuilder,
+    prev_callback: Optional[str],
+    next_callback: Optional[str],
+):
+    """Кнопки перехода между страницами списка"""
+    buttons = []
+    if prev_callback:
+        buttons.append(InlineKeyboardButton(text="◀️ Назад", callback_data=prev_callback))
+    if next_callback:
+        buttons.append(InlineKeyboardButton(text="Вперёд ▶️", callback_data=next_callback))
+    if buttons:
+        builder.row(*buttons)
+
+
 def get_tasks_keyboard(
     tasks: List[Task],
     project_id: Optional[int] = None,
     show_create: bool = True,
+    prev_callback: Optional[str] = None,
+    next_callback: Optional[str] = None,
 ) -> InlineKeyboardMarkup:
-    """Список задач"""
+    """Страница списка задач"""
     builder = InlineKeyboardBuilder()
     
     status_emoji = {
@@ -143,6 +162,8 @@ def get_tasks_keyboard(
             )
         )
     
+    _add_page_buttons(builder, prev_callback, next_callback)
+    
     if show_create and project_id:
         builder.row(
             InlineKeyboardButton(
@@ -493,6 +514,24 @@ def get_back_keyboard(callback_data: str) -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+def get_user_choices_keyboard(users: List[User]) -> InlineKeyboardMarkup:
+    """Выбор пользователя из найденных по username"""
+    builder = InlineKeyboardBuilder()
+    
+    for user in users:
+        builder.row(
+            InlineKeyboardButton(
+                text=f"{user.full_name} (@{user.username})",
+                callback_data=f"pick_user:{user.telegram_id}",
+            )
+        )
+    
+    builder.row(
+        InlineKeyboardButton(text="❌ Отмена", callback_data="cancel"),
+    )
+    return builder.as_markup()
+
+
 def get_cancel_keyboard() -> InlineKeyboardMarkup:
     """Кнопка отмены"""
     builder = InlineKeyboardBuilder()
@@ -503,23 +542,22 @@ def get_cancel_keyboard() -> InlineKeyboardMarkup:
 
 
 def get_assignees_selection_keyboard(
-    members: List[ProjectMember],
+    members: Sequence[Tuple[int, str]],
     selected_ids: List[int],
     project_id: int,
     task_id: Optional[int] = None,
 ) -> InlineKeyboardMarkup:
-    """Выбор ответственных за задачу"""
+    """Выбор ответственных за задачу. members — пары (user_id, имя)"""
     builder = InlineKeyboardBuilder()
     
-    for member in members:
-        is_selected = member.user_id in selected_ids
+    for user_id, user_name in members:
+        is_selected = user_id in selected_ids
         checkbox = "☑️" if is_selected else "⬜"
-        user_name = member.user.full_name if member.user else "Unknown"
         
         builder.row(
             InlineKeyboardButton(
                 text=f"{checkbox} {user_name}",
-                callback_data=f"select_assignee:{member.user_id}",
+                callback_data=f"select_assignee:{user_id}",
             )
         )
     
@@ -553,8 +591,12 @@ def get_assignees_selection_keyboard(
     return builder.as_markup()
 
 
-def get_my_tasks_keyboard(tasks: List[Task]) -> InlineKeyboardMarkup:
-    """Мои задачи с возможностью быстрой смены статуса"""
+def get_my_tasks_keyboard(
+    tasks: List[Task],
+    prev_callback: Optional[str] = None,
+    next_callback: Optional[str] = None,
+) -> InlineKeyboardMarkup:
+    """Страница моих задач с возможностью быстрой смены статуса"""
     builder = InlineKeyboardBuilder()
     
     status_emoji = {
@@ -580,6 +622,8 @@ def get_my_tasks_keyboard(tasks: List[Task]) -> InlineKeyboardMarkup:
             )
         )
     
+    _add_page_buttons(builder, prev_callback, next_callback)
+    
     builder.row(
         InlineKeyboardButton(text="🔙 Главное меню", callback_data="main_menu"),
     )
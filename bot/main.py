@@ -7,12 +7,16 @@ from pathlib import Path
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
 
 from bot.config import settings
 from bot.handlers import setup_routers
+from bot.middlewares import DbReleaseMiddleware, DbSessionMiddleware, UserSyncMiddleware
 from bot.services import setup_scheduler, shutdown_scheduler
+from bot.services.fsm_storage import create_fsm_storage
+from bot.services.outbox import start_outbox_dispatcher, stop_outbox_dispatcher
+from bot.webhook import run_webhook
 from database.connection import init_db, close_db
+from database.cache import start_membership_listener, stop_membership_listener
 
 
 def setup_logging():
@@ -115,8 +119,16 @@ async def on_startup(bot: Bot):
     await init_db()
     logger.info("Database initialized")
     
+    # Сброс кэша ролей при изменениях из веб-интерфейса
+    start_membership_listener()
+    
+    # Отправка уведомлений, накопленных в outbox
+    if settings.outbox_dispatcher_enabled:
+        start_outbox_dispatcher(bot)
+    
     # Запускаем планировщик
-    await setup_scheduler(bot)
+    if settings.scheduler_enabled:
+        await setup_scheduler()
     
     # Получаем информацию о боте
     bot_info = await bot.get_me()
@@ -130,6 +142,9 @@ async def on_shutdown(bot: Bot):
     # Останавливаем планировщик
     await shutdown_scheduler()
     
+    await stop_outbox_dispatcher()
+    await stop_membership_listener()
+    
     # Закрываем БД
     await close_db()
     
@@ -147,9 +162,16 @@ async def main():
         token=settings.bot_token,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML),
     )
+    # Читающая транзакция обновления не держит соединение во время запросов к API
+    bot.session.middleware(DbReleaseMiddleware())
     
     # Создаем диспетчер
-    dp = Dispatcher(storage=MemoryStorage())
+    dp = Dispatcher(storage=create_fsm_storage())
+    
+    # Одна сессия БД на обновление, репозитории передаются обработчикам
+    dp.update.outer_middleware(DbSessionMiddleware())
+    # Профили пользователей сохраняются до вызова обработчиков, в той же сессии
+    dp.update.outer_middleware(UserSyncMiddleware())
     
     # Регистрируем роутеры
     dp.include_router(setup_routers())
@@ -159,9 +181,13 @@ async def main():
     dp.shutdown.register(on_shutdown)
     
     try:
-        # Удаляем webhook и запускаем polling
-        await bot.delete_webhook(drop_pending_updates=True)
-        await dp.start_polling(bot)
+        if settings.bot_mode.lower() == "webhook":
+            logger.info("Running in webhook mode")
+            await run_webhook(bot, dp)
+        else:
+            # Удаляем webhook и запускаем polling
+            await bot.delete_webhook(drop_pending_updates=True)
+            await dp.start_polling(bot)
     finally:
         await bot.session.close()
 
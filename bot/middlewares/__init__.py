@@ -0,0 +1,8 @@
+from bot.middlewares.db_session import DbReleaseMiddleware, DbSessionMiddleware
+from bot.middlewares.user_sync import UserSyncMiddleware
+
+__all__ = [
+    "DbReleaseMiddleware",
+    "DbSessionMiddleware",
+    "UserSyncMiddleware",
+]
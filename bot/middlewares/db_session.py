@@ -0,0 +1,72 @@
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject, User
+
+from bot.config import settings
+from database.cache import mark_recent_write
+from database.connection import get_db_manager, release_read_transaction
+from database.repositories import (
+    OutboxRepository,
+    ProjectRepository,
+    RoleRepository,
+    TaskRepository,
+    UserRepository,
+)
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """
+    Одна сессия БД на обновление.
+    
+    Сессия и репозитории передаются обработчикам аргументами session,
+    user_repo, project_repo, task_repo, role_repo и outbox_repo. Соединение
+    берётся из пула только при первом запросе, коммит — один, после обработчика.
+    Обработчик, который пишет в БД, может закоммитить раньше, до ответа
+    в Telegram: тогда соединение освобождается на время запроса к API.
+    Читающие транзакции перед запросами к API завершает DbReleaseMiddleware.
+    
+    Если обработчик писал в БД и настроена реплика, пользователь отмечается
+    как недавно писавший: следующие обновления читают его списки с основной БД.
+    """
+    
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        db = get_db_manager()
+        async with db.session() as session:
+            data["session"] = session
+            data["user_repo"] = UserRepository(session)
+            data["project_repo"] = ProjectRepository(session)
+            data["task_repo"] = TaskRepository(session)
+            data["role_repo"] = RoleRepository(session)
+            data["outbox_repo"] = OutboxRepository(session)
+            result = await handler(event, data)
+            
+            user: Optional[User] = data.get("event_from_user")
+            if settings.database_replica_url and user is not None and session.info.get("has_written"):
+                await mark_recent_write(session, user.id)
+            return result
+
+
+class DbReleaseMiddleware(BaseRequestMiddleware):
+    """
+    Перед каждым запросом к Telegram API завершает транзакцию обновления,
+    в которой только читали, чтобы соединение не простаивало на время ответа.
+    Незакоммиченную запись не трогает — её коммитит обработчик или DbSessionMiddleware.
+    """
+    
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        await release_read_transaction()
+        return await make_request(bot, method)
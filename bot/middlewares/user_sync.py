@@ -0,0 +1,79 @@
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User as TelegramUser
+
+from database.repositories import UserRepository
+
+logger = logging.getLogger(__name__)
+
+
+class UserSyncMiddleware(BaseMiddleware):
+    """
+    Синхронизация профилей пользователей на каждом обновлении.
+    
+    Хеш последнего записанного профиля хранится в процессе, поэтому
+    для пользователей с неизменным профилем запрос к БД не выполняется.
+    Профиль записывается в сессии обновления (user_repo от DbSessionMiddleware,
+    который должен быть зарегистрирован раньше) и коммитится вместе с ней.
+    """
+    
+    def __init__(self, cache_size: int = 10_000):
+        self.cache_size = cache_size
+        self._profiles: "OrderedDict[int, int]" = OrderedDict()
+    
+    @staticmethod
+    def _profile_hash(user: TelegramUser) -> int:
+        return hash((user.username, user.first_name, user.last_name))
+    
+    def _remember(self, user_id: int, profile_hash: int):
+        self._profiles[user_id] = profile_hash
+        self._profiles.move_to_end(user_id)
+        while len(self._profiles) > self.cache_size:
+            self._profiles.popitem(last=False)
+    
+    async def _sync(self, user: TelegramUser, user_repo: UserRepository) -> bool:
+        """Записать профиль, если он изменился. True, если запрос к БД выполнялся"""
+        profile_hash = self._profile_hash(user)
+        if self._profiles.get(user.id) == profile_hash:
+            self._profiles.move_to_end(user.id)
+            return False
+        
+        # Точка сохранения: ошибка записи профиля не прерывает транзакцию обновления
+        async with user_repo.session.begin_nested():
+            written, created = await user_repo.sync_profile(
+                telegram_id=user.id,
+                username=user.username,
+                first_name=user.first_name,
+                last_name=user.last_name,
+            )
+        
+        if created:
+            logger.info(f"New user registered: {user.id} ({user.full_name})")
+        elif written:
+            logger.debug(f"User profile updated: {user.id}")
+        return True
+    
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        synced = False
+        if user is not None and not user.is_bot:
+            try:
+                synced = await self._sync(user, data["user_repo"])
+            except Exception as e:
+                # Ошибка синхронизации профиля не должна мешать обработке обновления
+                logger.error(f"Failed to sync user {user.id}: {e}")
+        
+        result = await handler(event, data)
+        # Запоминаем профиль, только если обновление не завершилось ошибкой:
+        # иначе транзакция откатится вместе с записью профиля
+        if synced:
+            self._remember(user.id, self._profile_hash(user))
+        return result
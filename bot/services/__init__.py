@@ -1,5 +1,15 @@
-from bot.services.scheduler import setup_scheduler, shutdown_scheduler
+from bot.services.scheduler import (
+    setup_scheduler,
+    shutdown_scheduler,
+    sync_project_reminder,
+    unschedule_project_reminder,
+)
 from bot.services.notifications import send_task_reminders
 
-__all__ = ["setup_scheduler", "shutdown_scheduler", "send_task_reminders"]
-
+__all__ = [
+    "setup_scheduler",
+    "shutdown_scheduler",
+    "sync_project_reminder",
+    "unschedule_project_reminder",
+    "send_task_reminders",
+]
@@ -0,0 +1,227 @@
+"""Доставка сообщений в Telegram с ограничением скорости и повторными попытками"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Dict, Iterable, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramNotFound,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+
+from bot.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Ошибки, при которых повторная отправка того же сообщения бессмысленна:
+# бот заблокирован, чат не найден, сообщение отклонено
+PERMANENT_ERRORS = (TelegramForbiddenError, TelegramBadRequest, TelegramNotFound)
+
+
+class DeliveryResult(str, Enum):
+    """Итог отправки сообщения"""
+    SENT = "sent"
+    RETRY = "retry"  # Временная ошибка: можно повторить позже
+    REJECTED = "rejected"  # Постоянная ошибка: повторять не нужно
+
+
+@dataclass
+class DeliveryStats:
+    """Метрики доставки пачки сообщений"""
+    total: int = 0
+    sent: int = 0
+    failed: int = 0
+    retried: int = 0
+    flood_waits: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: Optional[float] = None
+    
+    @property
+    def elapsed(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return end - self.started_at
+    
+    @property
+    def throughput(self) -> float:
+        """Отправлено сообщений в секунду"""
+        elapsed = self.elapsed
+        return self.sent / elapsed if elapsed > 0 else float(self.sent)
+    
+    def __str__(self) -> str:
+        return (
+            f"sent {self.sent}/{self.total} in {self.elapsed:.2f}s "
+            f"({self.throughput:.1f} msg/s), retried: {self.retried}, "
+            f"flood waits: {self.flood_waits}, failed: {self.failed}"
+        )
+
+
+class MessageSender:
+    """
+    Отправка сообщений с ограниченным параллелизмом.
+    Соблюдает лимиты Telegram (~30 сообщений/с всего и 1 сообщение/с в один чат),
+    выдерживает паузу TelegramRetryAfter (не больше max_flood_waits раз на сообщение)
+    и повторяет временные ошибки с backoff.
+    
+    Бот используется только через bot.send_message, поэтому вместо него
+    можно передать любой объект с таким методом.
+    """
+    
+    def __init__(
+        self,
+        bot: Bot,
+        concurrency: int = 10,
+        global_rate: float = 30.0,
+        per_chat_interval: float = 1.0,
+        max_retries: int = 3,
+        max_flood_waits: int = 5,
+        backoff_base: float = 1.0,
+    ):
+        self.bot = bot
+        self.max_retries = max_retries
+        self.max_flood_waits = max_flood_waits
+        self.backoff_base = backoff_base
+        self.per_chat_interval = per_chat_interval
+        self.stats = DeliveryStats()
+        
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._global_interval = 1.0 / global_rate if global_rate > 0 else 0.0
+        self._next_global_slot = 0.0
+        self._chat_locks: Dict[int, asyncio.Lock] = {}
+        self._last_chat_send: Dict[int, float] = {}
+    
+    async def _wait_global_slot(self):
+        """Забронировать ближайший слот общего лимита и дождаться его"""
+        now = time.monotonic()
+        slot = max(now, self._next_global_slot)
+        self._next_global_slot = slot + self._global_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+    
+    async def _wait_chat_slot(self, chat_id: int):
+        last = self._last_chat_send.get(chat_id)
+        if last is not None:
+            delay = last + self.per_chat_interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+    
+    def _prune_chats(self):
+        """Удалить состояние неактивных чатов, чтобы словари не росли бесконечно"""
+        if len(self._chat_locks) < 10_000:
+            return
+        threshold = time.monotonic() - self.per_chat_interval
+        for chat_id in list(self._chat_locks):
+            if not self._chat_locks[chat_id].locked() and self._last_chat_send.get(chat_id, 0.0) < threshold:
+                del self._chat_locks[chat_id]
+                self._last_chat_send.pop(chat_id, None)
+    
+    async def send(
+        self,
+        chat_id: int,
+        text: str,
+        stats: Optional[DeliveryStats] = None,
+        deadline: Optional[float] = None,
+        **kwargs,
+    ) -> DeliveryResult:
+        """
+        Отправить одно сообщение.
+        deadline — момент time.monotonic(), после которого попыток больше не делать
+        (например, конец аренды сообщения outbox): возвращается DeliveryResult.RETRY.
+        """
+        kwargs.setdefault("parse_mode", "HTML")
+        counters = [self.stats] if stats is None else [self.stats, stats]
+        attempt = 0
+        flood_waits = 0
+        
+        # Сообщения в один чат идут строго по очереди с интервалом per_chat_interval
+        lock = self._chat_locks.setdefault(chat_id, asyncio.Lock())
+        async with lock:
+            while True:
+                await self._wait_chat_slot(chat_id)
+                async with self._semaphore:
+                    await self._wait_global_slot()
+                    if deadline is not None and time.monotonic() >= deadline:
+                        logger.warning(f"Delivery deadline passed for chat {chat_id}, message postponed")
+                        result = DeliveryResult.RETRY
+                        break
+                    try:
+                        await self.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+                    except TelegramRetryAfter as e:
+                        # Flood control распространяется на весь бот: ставим на паузу все отправки
+                        self._next_global_slot = max(self._next_global_slot, time.monotonic() + e.retry_after)
+                        for c in counters:
+                            c.flood_waits += 1
+                        flood_waits += 1
+                        if flood_waits > self.max_flood_waits:
+                            logger.warning(f"Flood control for chat {chat_id} persists, message postponed")
+                            result = DeliveryResult.RETRY
+                            break
+                        logger.warning(f"Flood control for chat {chat_id}, retry after {e.retry_after}s")
+                        continue
+                    except (TelegramNetworkError, TelegramServerError) as e:
+                        attempt += 1
+                        if attempt > self.max_retries:
+                            logger.warning(f"Failed to send message to {chat_id} after {attempt} attempts: {e}")
+                            result = DeliveryResult.RETRY
+                            break
+                        for c in counters:
+                            c.retried += 1
+                        delay = self.backoff_base * 2 ** (attempt - 1)
+                        logger.debug(f"Transient error for chat {chat_id}: {e}, retry in {delay:.1f}s")
+                    except PERMANENT_ERRORS as e:
+                        logger.warning(f"Message to {chat_id} rejected: {e}")
+                        result = DeliveryResult.REJECTED
+                        break
+                    except TelegramAPIError as e:
+                        logger.warning(f"Failed to send message to {chat_id}: {e}")
+                        result = DeliveryResult.RETRY
+                        break
+                    else:
+                        for c in counters:
+                            c.sent += 1
+                        self._prune_chats()
+                        return DeliveryResult.SENT
+                    finally:
+                        self._last_chat_send[chat_id] = time.monotonic()
+                # Backoff ждём вне семафора, чтобы не занимать слот параллелизма
+                await asyncio.sleep(delay)
+        
+        for c in counters:
+            c.failed += 1
+        return result
+    
+    async def send_many(self, messages: Iterable[Tuple[int, str]], **kwargs) -> DeliveryStats:
+        """Отправить пачку сообщений (chat_id, text) параллельно"""
+        messages = list(messages)
+        stats = DeliveryStats(total=len(messages))
+        self.stats.total += len(messages)
+        
+        await asyncio.gather(
+            *(self.send(chat_id, text, stats=stats, **kwargs) for chat_id, text in messages)
+        )
+        
+        stats.finished_at = time.monotonic()
+        return stats
+
+
+_shared_sender: Optional[MessageSender] = None
+
+
+def get_message_sender(bot: Bot) -> MessageSender:
+    """Общий для процесса отправитель, чтобы лимиты соблюдались всеми задачами сразу"""
+    global _shared_sender
+    if _shared_sender is None or _shared_sender.bot is not bot:
+        _shared_sender = MessageSender(
+            bot,
+            concurrency=settings.send_concurrency,
+            global_rate=settings.send_rate_limit,
+        )
+    return _shared_sender
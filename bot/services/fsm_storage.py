@@ -0,0 +1,258 @@
+"""Хранилище состояний FSM в PostgreSQL"""
+
+import asyncio
+import copy
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from sqlalchemy import delete, select, and_
+from sqlalchemy.dialects.postgresql import insert
+
+from bot.config import settings
+from database.connection import get_db_manager
+from database.models import FsmRecord
+
+logger = logging.getLogger(__name__)
+
+# Сколько секунд неиспользуемая запись живёт в кэше процесса
+CACHE_IDLE_SECONDS = 600
+# Как часто удалять из БД заброшенные диалоги
+CLEANUP_INTERVAL_SECONDS = 600
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _json_object_hook(value: Dict[str, Any]) -> Any:
+    if len(value) == 1 and "__datetime__" in value:
+        return datetime.fromisoformat(value["__datetime__"])
+    return value
+
+
+def dump_data(data: Dict[str, Any]) -> str:
+    """Сериализовать данные FSM (datetime поддерживается)"""
+    return json.dumps(data, default=_json_default, ensure_ascii=False)
+
+
+def load_data(raw: Optional[str]) -> Dict[str, Any]:
+    """Десериализовать данные FSM"""
+    if not raw:
+        return {}
+    return json.loads(raw, object_hook=_json_object_hook)
+
+
+@dataclass
+class _Entry:
+    state: Optional[str] = None
+    data: Dict[str, Any] = field(default_factory=dict)
+    touched_at: float = field(default_factory=time.monotonic)
+    
+    @property
+    def is_empty(self) -> bool:
+        return self.state is None and not self.data
+
+
+class PostgresStorage(BaseStorage):
+    """
+    FSM хранилище в PostgreSQL через DatabaseManager.
+    
+    Записи кэшируются в процессе и сбрасываются в БД пачками раз в flush_interval
+    секунд (write-behind). При flush_interval=0 кэш отключается и каждая запись
+    сразу уходит в БД — этот режим нужен, если апдейты одного пользователя
+    обрабатывают несколько процессов. Диалоги без изменений дольше state_ttl
+    считаются заброшенными и удаляются отдельной фоновой задачей в любом режиме.
+    """
+    
+    def __init__(
+        self,
+        state_ttl: int = 86400,
+        flush_interval: float = 1.0,
+        key_builder: Optional[KeyBuilder] = None,
+    ):
+        self.state_ttl = state_ttl
+        self.flush_interval = flush_interval
+        self.key_builder = key_builder or DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        
+        self._cache: Dict[str, _Entry] = {}
+        self._dirty: Set[str] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._cleanup_task: Optional[asyncio.Task] = None
+    
+    @property
+    def _write_behind(self) -> bool:
+        return self.flush_interval > 0
+    
+    def _cutoff(self) -> datetime:
+        return datetime.utcnow() - timedelta(seconds=self.state_ttl)
+    
+    async def _load(self, key: str) -> _Entry:
+        if self._cleanup_task is None or self._cleanup_task.done():
+            self._cleanup_task = asyncio.create_task(self._cleanup_loop())
+        
+        entry = self._cache.get(key)
+        if entry is not None:
+            entry.touched_at = time.monotonic()
+            return entry
+        
+        db = get_db_manager()
+        async with db.session() as session:
+            result = await session.execute(
+                select(FsmRecord.state, FsmRecord.data).where(
+                    and_(
+                        FsmRecord.key == key,
+                        FsmRecord.updated_at >= self._cutoff(),
+                    )
+                )
+            )
+            row = result.one_or_none()
+        
+        entry = _Entry(state=row.state, data=load_data(row.data)) if row else _Entry()
+        if self._write_behind:
+            self._cache[key] = entry
+        return entry
+    
+    async def _store(self, key: str, entry: _Entry):
+        entry.touched_at = time.monotonic()
+        if not self._write_behind:
+            await self._write([key], {key: entry})
+            return
+        
+        self._cache[key] = entry
+        self._dirty.add(key)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+    
+    async def _write(self, keys: List[str], entries: Dict[str, _Entry]):
+        """Записать пачку изменений: пустые записи удаляются, остальные upsert-ятся"""
+        now = datetime.utcnow()
+        to_delete = [key for key in keys if entries[key].is_empty]
+        to_upsert = [
+            {
+                "key": key,
+                "state": entries[key].state,
+                "data": dump_data(entries[key].data),
+                "updated_at": now,
+            }
+            for key in keys
+            if not entries[key].is_empty
+        ]
+        
+        db = get_db_manager()
+        async with db.session() as session:
+            if to_delete:
+                await session.execute(delete(FsmRecord).where(FsmRecord.key.in_(to_delete)))
+            if to_upsert:
+                stmt = insert(FsmRecord).values(to_upsert)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[FsmRecord.key],
+                    set_={
+                        "state": stmt.excluded.state,
+                        "data": stmt.excluded.data,
+                        "updated_at": stmt.excluded.updated_at,
+                    },
+                )
+                await session.execute(stmt)
+    
+    async def flush(self):
+        """Сбросить накопленные изменения в БД"""
+        if not self._dirty:
+            return
+        
+        keys = list(self._dirty)
+        self._dirty.clear()
+        # Снимок записей: изменения во время записи попадут в следующую пачку
+        entries = {
+            key: _Entry(state=self._cache[key].state, data=copy.deepcopy(self._cache[key].data))
+            for key in keys
+        }
+        try:
+            await self._write(keys, entries)
+        except Exception as e:
+            self._dirty.update(keys)
+            logger.error(f"Failed to flush {len(keys)} FSM records: {e}")
+            return
+        logger.debug(f"Flushed {len(keys)} FSM records")
+    
+    async def cleanup(self):
+        """Удалить заброшенные диалоги из БД и неиспользуемые записи из кэша"""
+        idle_threshold = time.monotonic() - CACHE_IDLE_SECONDS
+        for key in [k for k, e in self._cache.items() if e.touched_at < idle_threshold and k not in self._dirty]:
+            del self._cache[key]
+        
+        db = get_db_manager()
+        async with db.session() as session:
+            result = await session.execute(delete(FsmRecord).where(FsmRecord.updated_at < self._cutoff()))
+        if result.rowcount:
+            logger.info(f"Removed {result.rowcount} abandoned FSM dialogs")
+    
+    async def _cleanup_loop(self):
+        while True:
+            await asyncio.sleep(CLEANUP_INTERVAL_SECONDS)
+            try:
+                await self.cleanup()
+            except Exception as e:
+                logger.error(f"FSM cleanup failed: {e}")
+    
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+            if not self._dirty and not self._cache:
+                # Нечего сбрасывать: цикл перезапустится при следующей записи
+                self._flush_task = None
+                return
+    
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        storage_key = self.key_builder.build(key)
+        current = await self._load(storage_key)
+        new_state = state.state if isinstance(state, State) else state
+        await self._store(storage_key, _Entry(state=new_state, data=current.data))
+    
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        entry = await self._load(self.key_builder.build(key))
+        return entry.state
+    
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        storage_key = self.key_builder.build(key)
+        current = await self._load(storage_key)
+        await self._store(storage_key, _Entry(state=current.state, data=copy.deepcopy(data)))
+    
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        entry = await self._load(self.key_builder.build(key))
+        return copy.deepcopy(entry.data)
+    
+    async def close(self) -> None:
+        for task in (self._flush_task, self._cleanup_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._flush_task = None
+        self._cleanup_task = None
+        await self.flush()
+
+
+def create_fsm_storage() -> BaseStorage:
+    """Создать FSM хранилище согласно настройкам (FSM_STORAGE=memory|postgres)"""
+    backend = settings.fsm_storage.lower()
+    if backend == "postgres":
+        logger.info("Using PostgreSQL FSM storage")
+        return PostgresStorage(
+            state_ttl=settings.fsm_state_ttl,
+            flush_interval=settings.fsm_flush_interval,
+        )
+    if backend != "memory":
+        logger.warning(f"Unknown FSM storage '{settings.fsm_storage}', falling back to memory")
+    return MemoryStorage()
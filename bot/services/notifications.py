@@ -1,198 +1,109 @@
 import logging
-from typing import Dict, List
-from datetime import timedelta, timezone
+from typing import Dict, List, Optional, Tuple
 
 from aiogram import Bot
 
 from database.connection import get_db_manager
-from database.repositories import TaskRepository, ProjectRepository
-from database.models import Task, TaskStatus
+from database.repositories import OutboxRepository, TaskRepository, ProjectRepository
+from database.models import Task
+from bot.config import settings
 from bot.utils import moscow_now, format_datetime
+from bot.utils.presentation import reference_time, render_digest, render_project_reminder
 
 logger = logging.getLogger(__name__)
 
 
-async def send_project_reminders(bot: Bot, project_id: int):
+async def build_reminders(
+    project_ids: List[int],
+    digest: bool = False,
+) -> List[Tuple[int, str]]:
     """
-    Отправка напоминаний для конкретного проекта.
-    Учитывает настройки напоминаний проекта.
+    Подготовка напоминаний для набора проектов одним запросом к БД.
+    В режиме digest каждый пользователь получает одну сводку по всем проектам,
+    иначе — отдельное напоминание от каждого проекта.
+    Возвращает список (user_id, текст сообщения).
     """
     db = get_db_manager()
-    
-    # Собираем все данные внутри сессии
-    project_name = None
-    user_tasks: Dict[int, List[dict]] = {}
-    user_overdue: Dict[int, List[dict]] = {}
-    
-    async with db.session() as session:
-        project_repo = ProjectRepository(session)
-        project = await project_repo.get_by_id(project_id)
-        
-        if not project or not project.reminders_enabled:
-            return
-        
-        project_name = project.name
-        reminder_days = project.reminder_days_before
-        
+    async with db.read_session() as session:
         task_repo = TaskRepository(session)
-        
-        # Получаем задачи с учётом настроек проекта
-        now = moscow_now()
-        deadline_threshold = now + timedelta(days=reminder_days)
-        
-        # Получаем все задачи проекта с приближающимися дедлайнами
-        tasks = await task_repo.get_project_tasks(project_id)
-        
-        # Фильтруем по дедлайну и статусу и собираем данные
-        for task in tasks:
-            if task.status in [TaskStatus.COMPLETED.value, TaskStatus.NOT_COMPLETED.value]:
-                continue
-            
-            if not task.deadline:
-                continue
-            
-            # Сравниваем с учётом timezone
-            task_deadline = task.deadline
-            if task_deadline.tzinfo is None:
-                task_deadline = task_deadline.replace(tzinfo=timezone.utc)
-            
-            now_utc = now.astimezone(timezone.utc) if now.tzinfo else now
-            threshold_utc = deadline_threshold.astimezone(timezone.utc) if deadline_threshold.tzinfo else deadline_threshold
-            
-            # Собираем данные задачи в словарь (не ORM объект)
-            task_data = {
-                "title": task.title,
-                "deadline": task.deadline,
-            }
-            
-            is_overdue = task_deadline < now_utc
-            is_upcoming = task_deadline <= threshold_utc
-            
-            # Группируем по пользователям
-            for assignee in task.assignees:
-                user_id = assignee.user_id
-                
-                if is_overdue:
-                    if user_id not in user_overdue:
-                        user_overdue[user_id] = []
-                    user_overdue[user_id].append(task_data)
-                elif is_upcoming:
-                    if user_id not in user_tasks:
-                        user_tasks[user_id] = []
-                    user_tasks[user_id].append(task_data)
+        rows = await task_repo.get_reminder_rows(project_ids)
     
-    # Теперь отправляем сообщения (вне сессии, но с простыми данными)
-    all_users = set(user_tasks.keys()) | set(user_overdue.keys())
-    sent_count = 0
+    # user_id -> project_id -> {"name", "overdue", "upcoming"}
+    grouped: Dict[int, Dict[int, dict]] = {}
+    for row in rows:
+        project = grouped.setdefault(row.user_id, {}).setdefault(
+            row.project_id,
+            {"name": row.project_name, "overdue": [], "upcoming": []},
+        )
+        project["overdue" if row.is_overdue else "upcoming"].append(row)
     
-    for user_id in all_users:
-        tasks_list = user_tasks.get(user_id, [])
-        overdue_list = user_overdue.get(user_id, [])
-        
-        if not tasks_list and not overdue_list:
-            continue
-        
-        message = f"🔔 <b>Напоминание от проекта \"{project_name}\"</b>\n\n"
-        
-        if overdue_list:
-            message += "🚨 <b>ПРОСРОЧЕННЫЕ ЗАДАЧИ:</b>\n"
-            message += "━━━━━━━━━━━━━━━━━━━━\n"
-            for i, task_data in enumerate(overdue_list, 1):
-                deadline_str = format_datetime(task_data["deadline"], with_year=True)
-                deadline = task_data["deadline"]
-                if deadline:
-                    now_naive = moscow_now().replace(tzinfo=None)
-                    deadline_naive = deadline.replace(tzinfo=None) if deadline.tzinfo else deadline
-                    days_overdue = (now_naive - deadline_naive).days
-                    overdue_text = f"просрочено на {days_overdue} дн." if days_overdue > 0 else "просрочено сегодня"
-                else:
-                    overdue_text = "просрочено"
-                
-                message += f"<b>{i}. {task_data['title']}</b>\n"
-                message += f"   ⚠️ {overdue_text} | DDL: {deadline_str}\n\n"
-            message += "\n"
-        
-        if tasks_list:
-            message += "📋 <b>ПРИБЛИЖАЮЩИЕСЯ ДЕДЛАЙНЫ:</b>\n"
-            message += "━━━━━━━━━━━━━━━━━━━━\n"
-            for i, task_data in enumerate(tasks_list, 1):
-                deadline_str = format_datetime(task_data["deadline"], with_year=True)
-                
-                # Определяем срочность и время до дедлайна
-                deadline = task_data["deadline"]
-                urgency_emoji = "📋"
-                time_left = ""
-                
-                if deadline:
-                    now_naive = moscow_now().replace(tzinfo=None)
-                    deadline_naive = deadline.replace(tzinfo=None) if deadline.tzinfo else deadline
-                    days_left = (deadline_naive - now_naive).days
-                    hours_left = (deadline_naive - now_naive).total_seconds() / 3600
-                    
-                    if days_left < 0:
-                        urgency_emoji = "🔴"
-                        time_left = f"просрочено на {abs(days_left)} дн."
-                    elif hours_left <= 24:
-                        urgency_emoji = "🔴"
-                        if hours_left < 1:
-                            time_left = "менее часа!"
-                        elif hours_left < 12:
-                            time_left = f"через {int(hours_left)} ч."
-                        else:
-                            time_left = "сегодня!"
-                    elif days_left <= 1:
-                        urgency_emoji = "🔴"
-                        time_left = "завтра!"
-                    elif days_left <= 2:
-                        urgency_emoji = "🟡"
-                        time_left = f"через {days_left} дн."
-                    else:
-                        urgency_emoji = "🟢"
-                        time_left = f"через {days_left} дн."
-                
-                message += f"{urgency_emoji} <b>{i}. {task_data['title']}</b>\n"
-                message += f"   📅 {deadline_str} ({time_left})\n\n"
-        
-        message += "💪 <i>Удачи в работе!</i>"
-        
-        try:
-            await bot.send_message(
-                chat_id=user_id,
-                text=message,
-                parse_mode="HTML",
-            )
-            sent_count += 1
-        except Exception as e:
-            logger.warning(f"Failed to send reminder to user {user_id}: {e}")
+    # Срочность всех задач считается относительно одного момента времени
+    now = reference_time()
+    messages: List[Tuple[int, str]] = []
+    for user_id, projects in grouped.items():
+        if digest:
+            texts = render_digest(projects, now)
+        else:
+            texts = [
+                text
+                for project in projects.values()
+                for text in render_project_reminder(project["name"], project["overdue"], project["upcoming"], now)
+            ]
+        messages.extend((user_id, text) for text in texts)
     
-    if sent_count > 0:
-        logger.info(f"Sent {sent_count} reminders for project {project_id} ({project_name})")
+    return messages
 
 
-async def send_all_reminders(bot: Bot):
+async def send_reminders(project_ids: List[int], digest: Optional[bool] = None):
     """
-    Отправка напоминаний для всех проектов.
-    Вызывается планировщиком каждую минуту для проверки.
+    Подготовка напоминаний для набора проектов и постановка их в outbox.
+    Отправляет их диспетчер outbox, планировщик Telegram не ждёт.
     """
-    now = moscow_now()
-    current_hour = now.hour
-    current_minute = now.minute
+    if not project_ids:
+        return
     
-    logger.debug(f"Checking reminders at {current_hour:02d}:{current_minute:02d} MSK")
+    if digest is None:
+        digest = settings.reminder_digest
+    
+    messages = await build_reminders(project_ids, digest=digest)
+    if not messages:
+        return
     
     db = get_db_manager()
     async with db.session() as session:
+        outbox_repo = OutboxRepository(session)
+        queued = await outbox_repo.add_many(messages)
+    logger.info(f"Reminders for {len(project_ids)} projects (digest: {digest}): {queued} messages queued")
+
+
+async def send_project_reminders(project_id: int):
+    """Отправка напоминаний для конкретного проекта"""
+    await send_reminders([project_id], digest=False)
+
+
+async def send_slot_reminders(hour: int, minute: int):
+    """
+    Отправка напоминаний всех проектов, назначенных на указанное время.
+    Вызывается планировщиком в это время.
+    """
+    logger.debug(f"Sending reminders for {hour:02d}:{minute:02d} MSK")
+    
+    db = get_db_manager()
+    async with db.read_session() as session:
         project_repo = ProjectRepository(session)
-        projects = await project_repo.get_active_projects()
+        project_ids = await project_repo.get_projects_due_for_reminder(hour, minute)
     
-    for project in projects:
-        if not project.reminders_enabled:
-            continue
-        
-        # Проверяем, совпадает ли время
-        if project.reminder_hour == current_hour and project.reminder_minute == current_minute:
-            logger.info(f"Sending reminders for project {project.id} ({project.name})")
-            await send_project_reminders(bot, project.id)
+    await send_reminders(project_ids)
+
+
+async def send_all_reminders():
+    """
+    Отправка напоминаний для всех проектов, запланированных на текущую минуту.
+    Планировщик запускает send_slot_reminders сам,
+    эта функция оставлена для ручного запуска.
+    """
+    now = moscow_now()
+    await send_slot_reminders(now.hour, now.minute)
 
 
 async def send_task_reminders(bot: Bot, days_before: int = 3):
@@ -200,7 +111,7 @@ async def send_task_reminders(bot: Bot, days_before: int = 3):
     Старый метод для обратной совместимости.
     Отправляет напоминания для всех проектов сразу.
     """
-    await send_all_reminders(bot)
+    await send_all_reminders()
 
 
 async def send_deadline_notification(bot: Bot, task: Task, user_id: int):
@@ -216,12 +127,8 @@ async def send_deadline_notification(bot: Bot, task: Task, user_id: int):
         f"<i>Не забудьте выполнить задачу вовремя!</i>"
     )
     
-    try:
-        await bot.send_message(
-            chat_id=user_id,
-            text=message,
-            parse_mode="HTML",
-        )
-        logger.debug(f"Deadline notification sent to user {user_id} for task {task.id}")
-    except Exception as e:
-        logger.warning(f"Failed to send deadline notification to user {user_id}: {e}")
+    db = get_db_manager()
+    async with db.session() as session:
+        outbox_repo = OutboxRepository(session)
+        await outbox_repo.add(user_id, message)
+    logger.debug(f"Deadline notification queued for user {user_id}, task {task.id}")
@@ -0,0 +1,179 @@
+"""Диспетчер outbox: отправка накопленных исходящих сообщений в Telegram"""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from aiogram import Bot
+
+from bot.config import settings
+from bot.services.delivery import DeliveryResult, DeliveryStats, get_message_sender
+from database.connection import get_db_manager
+from database.repositories import OutboxRepository
+
+logger = logging.getLogger(__name__)
+
+# Задержка перед первой повторной попыткой, дальше удваивается
+RETRY_BASE_SECONDS = 30
+
+# Последняя попытка отправки начинается не позже чем за столько секунд до конца
+# аренды: запрос должен успеть завершиться, пока пачку не захватил другой диспетчер
+LEASE_SEND_MARGIN_SECONDS = 30
+
+# Как часто и какие отправленные сообщения удалять из outbox
+PURGE_INTERVAL_SECONDS = 3600
+PURGE_AFTER = timedelta(days=7)
+
+
+class OutboxDispatcher:
+    """
+    Фоновая отправка сообщений из таблицы outbox.
+    
+    Пачки захватываются через SKIP LOCKED, поэтому диспетчеры можно запускать
+    в нескольких процессах. Параллелизм и лимиты Telegram обеспечивает общий
+    MessageSender. Доставка «хотя бы один раз»: если процесс упадёт между
+    отправкой и отметкой, сообщение уйдёт повторно после окончания аренды.
+    """
+    
+    def __init__(
+        self,
+        bot: Bot,
+        batch_size: int = 100,
+        poll_interval: float = 1.0,
+        max_attempts: int = 5,
+    ):
+        self.bot = bot
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self._task: Optional[asyncio.Task] = None
+        self._last_purge = time.monotonic()
+    
+    @property
+    def lease_seconds(self) -> float:
+        """
+        Время аренды пачки с запасом на худший случай: вся пачка в один чат,
+        куда Telegram разрешает не больше одного сообщения в секунду,
+        и запасом на завершение последнего запроса
+        """
+        return max(60.0, 2.0 * self.batch_size) + LEASE_SEND_MARGIN_SECONDS
+    
+    async def dispatch_batch(self) -> int:
+        """Захватить и отправить одну пачку. Возвращает размер пачки"""
+        db = get_db_manager()
+        # Аренда отсчитывается от захвата; не позже deadline отправка прекращается,
+        # и необработанные сообщения возвращаются в очередь через retry_later
+        deadline = time.monotonic() + self.lease_seconds - LEASE_SEND_MARGIN_SECONDS
+        async with db.session() as session:
+            outbox_repo = OutboxRepository(session)
+            items = await outbox_repo.claim_batch(self.batch_size, self.lease_seconds)
+        
+        if not items:
+            return 0
+        
+        sender = get_message_sender(self.bot)
+        stats = DeliveryStats(total=len(items))
+        sender.stats.total += len(items)
+        results = await asyncio.gather(
+            *(sender.send(item.chat_id, item.text, stats=stats, deadline=deadline) for item in items)
+        )
+        stats.finished_at = time.monotonic()
+        
+        delivered: List[int] = []
+        failed: List[int] = []
+        retries: Dict[int, List[int]] = defaultdict(list)
+        for item, result in zip(items, results):
+            if result is DeliveryResult.SENT:
+                delivered.append(item.id)
+            elif result is DeliveryResult.REJECTED or item.attempts >= self.max_attempts:
+                # Заблокированный бот или несуществующий чат не повторяем
+                failed.append(item.id)
+            else:
+                retries[item.attempts].append(item.id)
+        
+        now = datetime.utcnow()
+        async with db.session() as session:
+            outbox_repo = OutboxRepository(session)
+            await outbox_repo.mark_delivered(delivered)
+            await outbox_repo.mark_failed(failed)
+            for attempts, ids in retries.items():
+                delay = RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+                await outbox_repo.retry_later(ids, now + timedelta(seconds=delay))
+        
+        if failed:
+            logger.warning(f"Outbox: {len(failed)} messages failed")
+        logger.info(
+            f"Outbox batch: {stats}; "
+            f"{sum(len(ids) for ids in retries.values())} to retry, {len(failed)} marked failed"
+        )
+        return len(items)
+    
+    async def _purge(self):
+        db = get_db_manager()
+        async with db.session() as session:
+            outbox_repo = OutboxRepository(session)
+            purged = await outbox_repo.purge_delivered(PURGE_AFTER)
+        if purged:
+            logger.info(f"Outbox: purged {purged} delivered messages")
+    
+    async def _run(self):
+        while True:
+            try:
+                count = await self.dispatch_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Outbox dispatch failed: {e}")
+                count = 0
+            
+            if time.monotonic() - self._last_purge >= PURGE_INTERVAL_SECONDS:
+                self._last_purge = time.monotonic()
+                try:
+                    await self._purge()
+                except Exception as e:
+                    logger.error(f"Outbox purge failed: {e}")
+            
+            # Полная пачка — возможно, есть ещё сообщения: берём следующую сразу
+            if count < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+    
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Outbox dispatcher started (batch size: {self.batch_size})")
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+_dispatcher: Optional[OutboxDispatcher] = None
+
+
+def start_outbox_dispatcher(bot: Bot):
+    """Запустить отправку сообщений из outbox"""
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = OutboxDispatcher(
+            bot,
+            batch_size=settings.outbox_batch_size,
+            poll_interval=settings.outbox_poll_interval,
+            max_attempts=settings.outbox_max_attempts,
+        )
+    _dispatcher.start()
+
+
+async def stop_outbox_dispatcher():
+    """Остановить отправку сообщений из outbox"""
+    global _dispatcher
+    if _dispatcher is not None:
+        await _dispatcher.stop()
+        _dispatcher = None
@@ -1,34 +1,147 @@
 import logging
+from typing import Dict, Set, Tuple
+
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
-from aiogram import Bot
+from apscheduler.triggers.interval import IntervalTrigger
+from apscheduler.jobstores.base import JobLookupError
 
-from bot.services.notifications import send_all_reminders
+from database.connection import get_db_manager
+from database.repositories import ProjectRepository
+from bot.services.notifications import send_slot_reminders
 
 logger = logging.getLogger(__name__)
 
 scheduler: AsyncIOScheduler | None = None
 
+# Префикс ID задач планировщика для напоминаний
+REMINDER_JOB_PREFIX = "reminder_slot:"
+
+# Время напоминания (час, минута) -> ID проектов, и обратное отображение
+_slot_projects: Dict[Tuple[int, int], Set[int]] = {}
+_project_slots: Dict[int, Tuple[int, int]] = {}
+
+
+def _reminder_job_id(hour: int, minute: int) -> str:
+    return f"{REMINDER_JOB_PREFIX}{hour:02d}:{minute:02d}"
+
+
+def _add_slot_job(hour: int, minute: int):
+    """
+    Задача на время напоминания. Одна задача обслуживает все проекты
+    с этим временем, чтобы в режиме сводки собрать их за один тик.
+    """
+    scheduler.add_job(
+        send_slot_reminders,
+        CronTrigger(hour=hour, minute=minute),
+        args=[hour, minute],
+        id=_reminder_job_id(hour, minute),
+        name=f"Reminders at {hour:02d}:{minute:02d}",
+        replace_existing=True,
+        misfire_grace_time=60,
+        coalesce=True,
+    )
+    logger.debug(f"Reminder job scheduled at {hour:02d}:{minute:02d}")
+
+
+def _remove_slot_job(hour: int, minute: int):
+    try:
+        scheduler.remove_job(_reminder_job_id(hour, minute))
+        logger.debug(f"Reminder job at {hour:02d}:{minute:02d} removed")
+    except JobLookupError:
+        pass
+
+
+def schedule_project_reminder(project_id: int, hour: int, minute: int):
+    """Добавить или перепланировать напоминание проекта"""
+    if scheduler is None:
+        return
+    
+    slot = (hour, minute)
+    if _project_slots.get(project_id) == slot:
+        return
+    
+    unschedule_project_reminder(project_id)
+    
+    projects = _slot_projects.setdefault(slot, set())
+    if not projects:
+        _add_slot_job(hour, minute)
+    projects.add(project_id)
+    _project_slots[project_id] = slot
+
 
-async def setup_scheduler(bot: Bot):
+def unschedule_project_reminder(project_id: int):
+    """Удалить напоминание проекта из планировщика"""
+    if scheduler is None:
+        return
+    
+    slot = _project_slots.pop(project_id, None)
+    if slot is None:
+        return
+    
+    projects = _slot_projects.get(slot, set())
+    projects.discard(project_id)
+    if not projects:
+        _slot_projects.pop(slot, None)
+        _remove_slot_job(*slot)
+
+
+def sync_project_reminder(project_id: int, enabled: bool, hour: int, minute: int):
+    """Привести задачи планировщика в соответствие с настройками проекта"""
+    if enabled:
+        schedule_project_reminder(project_id, hour, minute)
+    else:
+        unschedule_project_reminder(project_id)
+
+
+async def sync_reminder_jobs():
+    """
+    Синхронизировать задачи планировщика с настройками проектов в БД.
+    Подхватывает проекты, изменённые вне бота (веб-интерфейс, скрипты).
+    """
+    if scheduler is None:
+        return
+    
+    db = get_db_manager()
+    async with db.session() as session:
+        project_repo = ProjectRepository(session)
+        schedule = await project_repo.get_reminder_schedule()
+    
+    actual = {project_id: (hour, minute) for project_id, hour, minute in schedule}
+    
+    # Удаляем проекты, которые отключены или удалены
+    for project_id in set(_project_slots) - set(actual):
+        unschedule_project_reminder(project_id)
+    
+    for project_id, (hour, minute) in actual.items():
+        schedule_project_reminder(project_id, hour, minute)
+    
+    logger.debug(f"Reminder jobs synced: {len(actual)} projects in {len(_slot_projects)} time slots")
+
+
+async def setup_scheduler():
     """Настройка и запуск планировщика"""
     global scheduler
     
     scheduler = AsyncIOScheduler(timezone="Europe/Moscow")
+    scheduler.start()
+    
+    # Cron-задачи создаются только на занятые проектами времена напоминаний,
+    # поэтому между напоминаниями планировщик простаивает
+    await sync_reminder_jobs()
     
-    # Проверяем каждую минуту, нужно ли отправлять напоминания
-    # (каждый проект имеет свои настройки времени)
+    # Периодическая сверка с БД на случай изменений вне бота
     scheduler.add_job(
-        send_all_reminders,
-        CronTrigger(minute="*"),  # Каждую минуту
-        args=[bot],
-        id="check_reminders",
-        name="Check and send project reminders",
+        sync_reminder_jobs,
+        IntervalTrigger(hours=1),
+        id="sync_reminder_jobs",
+        name="Sync project reminder jobs",
         replace_existing=True,
     )
     
-    scheduler.start()
-    logger.info("Scheduler started. Checking reminders every minute.")
+    logger.info(
+        f"Scheduler started. {len(_project_slots)} projects in {len(_slot_projects)} reminder time slots."
+    )
 
 
 async def shutdown_scheduler():
@@ -38,4 +151,6 @@ async def shutdown_scheduler():
     if scheduler:
         scheduler.shutdown(wait=False)
         scheduler = None
+        _slot_projects.clear()
+        _project_slots.clear()
         logger.info("Scheduler stopped")
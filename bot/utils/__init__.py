@@ -1,5 +1,12 @@
 from bot.utils.timezone import moscow_now, to_moscow, format_datetime, parse_datetime
-from bot.utils.telegram import safe_edit_text
-
-__all__ = ["moscow_now", "to_moscow", "format_datetime", "parse_datetime", "safe_edit_text"]
+from bot.utils.telegram import safe_edit_text, split_message, TELEGRAM_MESSAGE_LIMIT
 
+__all__ = [
+    "moscow_now",
+    "to_moscow",
+    "format_datetime",
+    "parse_datetime",
+    "safe_edit_text",
+    "split_message",
+    "TELEGRAM_MESSAGE_LIMIT",
+]
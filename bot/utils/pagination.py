@@ -0,0 +1,26 @@
+"""Упаковка курсоров постраничного вывода в callback_data"""
+
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+# Курсор: (deadline, id) задачи на границе страницы
+Cursor = Tuple[Optional[datetime], int]
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def pack_cursor(cursor: Cursor) -> str:
+    """Курсор в строку "<микросекунды UTC>:<id>" ("-" вместо пустого дедлайна)"""
+    deadline, item_id = cursor
+    if deadline is None:
+        return f"-:{item_id}"
+    deadline = deadline.replace(tzinfo=None)
+    micros = (deadline - _EPOCH) // timedelta(microseconds=1)
+    return f"{micros}:{item_id}"
+
+
+def unpack_cursor(value: str) -> Cursor:
+    """Обратное преобразование pack_cursor. ValueError при неверном формате"""
+    raw_deadline, raw_id = value.split(":")
+    deadline = None if raw_deadline == "-" else _EPOCH + timedelta(microseconds=int(raw_deadline))
+    return deadline, int(raw_id)
@@ -0,0 +1,163 @@
+"""Оформление списков задач: срочность дедлайнов и сборка текста сообщений"""
+
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+from database.models import TaskStatus
+from bot.utils.telegram import split_message
+from bot.utils.timezone import format_datetime
+
+STATUS_NAMES = {
+    TaskStatus.PENDING.value: "⏳ Ожидает",
+    TaskStatus.IN_PROGRESS.value: "🔄 В работе",
+    TaskStatus.COMPLETED.value: "✅ Выполнено",
+    TaskStatus.DELAYED.value: "⚠️ Задерживается",
+    TaskStatus.NOT_COMPLETED.value: "❌ Не выполнено",
+}
+
+SEPARATOR = "━━━━━━━━━━━━━━━━━━━━"
+
+
+class Urgency(NamedTuple):
+    """Срочность дедлайна: значок и подпись («через 3 дн.», «просрочено сегодня»)"""
+    emoji: str
+    label: str
+    
+    @property
+    def is_urgent(self) -> bool:
+        return self.emoji == "🔴"
+
+
+def reference_time() -> datetime:
+    """Текущее время в формате дедлайнов в БД (UTC без часового пояса)"""
+    return datetime.utcnow()
+
+
+def classify_deadline(deadline: datetime, now: datetime) -> Urgency:
+    """Срочность дедлайна относительно now (UTC без часового пояса)"""
+    if deadline.tzinfo is not None:
+        deadline = deadline.astimezone(timezone.utc).replace(tzinfo=None)
+    
+    delta = deadline - now
+    if delta.total_seconds() < 0:
+        days_overdue = (-delta).days
+        if days_overdue > 0:
+            return Urgency("🔴", f"просрочено на {days_overdue} дн.")
+        return Urgency("🔴", "просрочено сегодня")
+    
+    hours_left = delta.total_seconds() / 3600
+    days_left = delta.days
+    if hours_left < 1:
+        return Urgency("🔴", "менее часа!")
+    if hours_left < 12:
+        return Urgency("🔴", f"через {int(hours_left)} ч.")
+    if hours_left <= 24:
+        return Urgency("🔴", "сегодня!")
+    if days_left <= 1:
+        return Urgency("🔴", "завтра!")
+    if days_left <= 2:
+        return Urgency("🟡", f"через {days_left} дн.")
+    return Urgency("🟢", f"через {days_left} дн.")
+
+
+def classify_deadlines(
+    deadlines: Iterable[Optional[datetime]],
+    now: Optional[datetime] = None,
+) -> List[Optional[Urgency]]:
+    """Срочность набора дедлайнов относительно одного момента времени (None без дедлайна)"""
+    if now is None:
+        now = reference_time()
+    return [classify_deadline(deadline, now) if deadline is not None else None for deadline in deadlines]
+
+
+def render_my_tasks(tasks: Sequence, now: Optional[datetime] = None) -> List[str]:
+    """Список задач пользователя, разбитый по лимиту длины сообщения"""
+    blocks = [f"📋 <b>Ваши активные задачи</b>\n{SEPARATOR}\n\n"]
+    urgencies = classify_deadlines((task.deadline for task in tasks), now)
+    
+    for i, (task, urgency) in enumerate(zip(tasks, urgencies), 1):
+        status = STATUS_NAMES.get(task.status, "?")
+        project_name = task.project.name if task.project else "?"
+        
+        if urgency is None:
+            blocks.append(f"<b>{i}. {task.title}</b>\n   {status} | 📁 {project_name}\n\n")
+            continue
+        
+        icon = "⚠️" if urgency.is_urgent else "📅"
+        label = urgency.label[:1].upper() + urgency.label[1:]
+        blocks.append(
+            f"{urgency.emoji} <b>{i}. {task.title}</b>\n"
+            f"   {status} | 📁 {project_name}\n"
+            f"   {icon} {label} | DDL: {format_datetime(task.deadline, with_year=True)}\n\n"
+        )
+    
+    return split_message(blocks)
+
+
+def _overdue_blocks(tasks: Sequence, now: datetime) -> List[str]:
+    """Блоки текста для просроченных задач"""
+    blocks = [f"🚨 <b>ПРОСРОЧЕННЫЕ ЗАДАЧИ:</b>\n{SEPARATOR}\n"]
+    urgencies = classify_deadlines((task.deadline for task in tasks), now)
+    for i, (task, urgency) in enumerate(zip(tasks, urgencies), 1):
+        overdue_text = urgency.label if urgency else "просрочено"
+        blocks.append(
+            f"<b>{i}. {task.title}</b>\n"
+            f"   ⚠️ {overdue_text} | DDL: {format_datetime(task.deadline, with_year=True)}\n\n"
+        )
+    blocks.append("\n")
+    return blocks
+
+
+def _upcoming_blocks(tasks: Sequence, now: datetime) -> List[str]:
+    """Блоки текста для задач с приближающимся дедлайном"""
+    blocks = [f"📋 <b>ПРИБЛИЖАЮЩИЕСЯ ДЕДЛАЙНЫ:</b>\n{SEPARATOR}\n"]
+    urgencies = classify_deadlines((task.deadline for task in tasks), now)
+    for i, (task, urgency) in enumerate(zip(tasks, urgencies), 1):
+        emoji, time_left = urgency if urgency else ("📋", "")
+        blocks.append(
+            f"{emoji} <b>{i}. {task.title}</b>\n"
+            f"   📅 {format_datetime(task.deadline, with_year=True)} ({time_left})\n\n"
+        )
+    return blocks
+
+
+def _reminder_blocks(overdue: Sequence, upcoming: Sequence, now: datetime) -> List[str]:
+    blocks = []
+    if overdue:
+        blocks.extend(_overdue_blocks(overdue, now))
+    if upcoming:
+        blocks.extend(_upcoming_blocks(upcoming, now))
+    return blocks
+
+
+def render_project_reminder(
+    project_name: str,
+    overdue: Sequence,
+    upcoming: Sequence,
+    now: Optional[datetime] = None,
+) -> List[str]:
+    """
+    Напоминание от одного проекта, разбитое по лимиту длины сообщения.
+    Задачи — любые объекты с полями title и deadline.
+    """
+    if now is None:
+        now = reference_time()
+    blocks = [f"🔔 <b>Напоминание от проекта \"{project_name}\"</b>\n\n"]
+    blocks.extend(_reminder_blocks(overdue, upcoming, now))
+    blocks.append("💪 <i>Удачи в работе!</i>")
+    return split_message(blocks)
+
+
+def render_digest(projects: Dict[int, dict], now: Optional[datetime] = None) -> List[str]:
+    """
+    Сводка по всем проектам пользователя, разбитая по лимиту длины сообщения.
+    projects: project_id -> {"name", "overdue", "upcoming"}
+    """
+    if now is None:
+        now = reference_time()
+    blocks = ["🔔 <b>Напоминание о задачах</b>\n\n"]
+    for project in projects.values():
+        blocks.append(f"📁 <b>{project['name']}</b>\n\n")
+        blocks.extend(_reminder_blocks(project["overdue"], project["upcoming"], now))
+    blocks.append("💪 <i>Удачи в работе!</i>")
+    return split_message(blocks)
@@ -1,5 +1,7 @@
 """Утилиты для работы с Telegram API"""
 
+from typing import Iterable, List
+
 from aiogram import Bot
 from aiogram.types import Message, CallbackQuery
 from aiogram.exceptions import TelegramBadRequest
@@ -48,3 +50,37 @@ async def safe_edit_text(
     except Exception as e:
         logger.error(f"Error editing message: {e}")
         raise
+
+
+# Максимальная длина текста сообщения в Telegram
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+
+def split_message(blocks: Iterable[str], limit: int = TELEGRAM_MESSAGE_LIMIT) -> List[str]:
+    """
+    Собрать блоки текста в сообщения не длиннее limit символов.
+    Блоки не разрываются, если помещаются в одно сообщение целиком.
+    """
+    messages: List[str] = []
+    current: List[str] = []
+    current_len = 0
+    
+    for block in blocks:
+        # Слишком длинный блок режем по строкам, а строки — по limit
+        if len(block) > limit:
+            pieces = []
+            for line in block.splitlines(keepends=True):
+                pieces.extend(line[i:i + limit] for i in range(0, len(line), limit))
+        else:
+            pieces = [block]
+        
+        for piece in pieces:
+            if current_len + len(piece) > limit and current:
+                messages.append("".join(current))
+                current, current_len = [], 0
+            current.append(piece)
+            current_len += len(piece)
+    
+    if current:
+        messages.append("".join(current))
+    return messages
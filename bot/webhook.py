@@ -0,0 +1,181 @@
+"""Приём обновлений Telegram через webhook (FastAPI + uvicorn)"""
+
+import asyncio
+import logging
+import secrets
+from contextlib import asynccontextmanager, suppress
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from fastapi import FastAPI, Header, HTTPException, Request
+from pydantic import ValidationError
+
+from bot.config import settings
+from database.connection import get_db_manager
+
+logger = logging.getLogger(__name__)
+
+# Сколько секунд при остановке дожидаться обработки уже принятых обновлений
+DRAIN_TIMEOUT_SECONDS = 10
+
+
+class UpdateQueue:
+    """
+    Очередь входящих обновлений с пулом обработчиков.
+    
+    Webhook отвечает Telegram сразу после постановки в очередь, а обновления
+    обрабатываются параллельно не более чем workers штук. Когда очередь
+    заполнена, endpoint отвечает 503 — Telegram повторит доставку позже.
+    """
+    
+    def __init__(self, bot: Bot, dp: Dispatcher, workers: int = 8, max_size: int = 1000):
+        self.bot = bot
+        self.dp = dp
+        self.workers = workers
+        self._queue: asyncio.Queue[Update] = asyncio.Queue(maxsize=max_size)
+        self._tasks: List[asyncio.Task] = []
+        self._workflow_data: Dict[str, Any] = {}
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+    
+    @property
+    def size(self) -> int:
+        return self._queue.qsize()
+    
+    def put(self, update: Update) -> bool:
+        """Поставить обновление в очередь. False, если очередь переполнена"""
+        try:
+            self._queue.put_nowait(update)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+        return True
+    
+    async def _worker(self):
+        while True:
+            update = await self._queue.get()
+            try:
+                await self.dp.feed_update(self.bot, update, **self._workflow_data)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.exception(f"Failed to process update {update.update_id}: {e}")
+            finally:
+                self._queue.task_done()
+    
+    def start(self, **workflow_data):
+        self._workflow_data = workflow_data
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"Update workers started: {self.workers}, queue size: {self._queue.maxsize}")
+    
+    async def stop(self, timeout: float = DRAIN_TIMEOUT_SECONDS):
+        """Дождаться обработки принятых обновлений и остановить обработчики"""
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Update queue not drained in {timeout}s, {self.size} updates dropped")
+        
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            with suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
+
+
+def create_webhook_app(bot: Bot, dp: Dispatcher) -> FastAPI:
+    """
+    ASGI-приложение для приёма обновлений.
+    
+    Если WEBHOOK_URL не задан, webhook в Telegram не регистрируется —
+    так endpoint можно проверить локально, отправляя POST с JSON обновления.
+    Публичный webhook без WEBHOOK_SECRET не запускается: иначе обновления
+    мог бы присылать кто угодно.
+    """
+    if settings.webhook_url and not settings.webhook_secret:
+        raise RuntimeError("WEBHOOK_SECRET must be set when WEBHOOK_URL is set")
+    
+    updates = UpdateQueue(
+        bot,
+        dp,
+        workers=settings.webhook_workers,
+        max_size=settings.webhook_queue_size,
+    )
+    
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        workflow_data = {"dispatcher": dp, "bots": [bot], **dp.workflow_data}
+        await dp.emit_startup(bot=bot, **workflow_data)
+        updates.start(**workflow_data)
+        
+        if settings.webhook_url:
+            url = settings.webhook_url.rstrip("/") + settings.webhook_path
+            await bot.set_webhook(
+                url,
+                secret_token=settings.webhook_secret,
+                allowed_updates=dp.resolve_used_update_types(),
+                max_connections=settings.webhook_workers,
+            )
+            logger.info(f"Webhook set: {url}")
+        else:
+            logger.warning("WEBHOOK_URL is not set, webhook is not registered in Telegram")
+        
+        try:
+            yield
+        finally:
+            # Webhook не удаляем: при нескольких репликах остальные продолжают принимать обновления
+            await updates.stop()
+            await dp.emit_shutdown(bot=bot, **workflow_data)
+    
+    app = FastAPI(title="VShu Task Bot - Webhook", lifespan=lifespan)
+    
+    @app.post(settings.webhook_path)
+    async def webhook(
+        request: Request,
+        secret_token: Optional[str] = Header(None, alias="X-Telegram-Bot-Api-Secret-Token"),
+    ):
+        """Принять обновление от Telegram"""
+        if settings.webhook_secret and not secrets.compare_digest(
+            secret_token or "", settings.webhook_secret
+        ):
+            raise HTTPException(status_code=401, detail="Invalid secret token")
+        
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": bot})
+        except (ValueError, ValidationError):
+            raise HTTPException(status_code=400, detail="Invalid update")
+        
+        if not updates.put(update):
+            logger.warning(f"Update queue is full, update {update.update_id} rejected")
+            raise HTTPException(status_code=503, detail="Update queue is full")
+        
+        return {"ok": True}
+    
+    @app.get("/health")
+    async def health():
+        """Состояние очереди обновлений"""
+        return {
+            "queue": updates.size,
+            "workers": updates.workers,
+            "processed": updates.processed,
+            "failed": updates.failed,
+            "rejected": updates.rejected,
+            "db_pool": get_db_manager().pool_stats_report(),
+        }
+    
+    return app
+
+
+async def run_webhook(bot: Bot, dp: Dispatcher):
+    """Запуск бота в режиме webhook"""
+    app = create_webhook_app(bot, dp)
+    config = uvicorn.Config(
+        app,
+        host=settings.webhook_host,
+        port=settings.webhook_port,
+        log_level=settings.log_level.lower(),
+    )
+    await uvicorn.Server(config).serve()
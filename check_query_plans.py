@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Проверка планов запросов репозиториев: ни один частый запрос
+не должен читать таблицы последовательным сканированием или
+обходом индекса без условия поиска.
+
+Скрипт заполняет БД тестовыми данными внутри транзакции, собирает
+статистику (ANALYZE), выполняет EXPLAIN для каждого частого запроса (_checks)
+с обычными настройками планировщика и откатывает транзакцию — данные в БД
+не меняются. Если для запроса нет подходящего индекса, планировщик выберет
+Seq Scan или полный обход постороннего индекса (Index Scan без Index Cond).
+
+Использование (после alembic upgrade head):
+    python check_query_plans.py
+    docker-compose exec bot python check_query_plans.py
+
+Код возврата 1, если хотя бы один запрос читает таблицу без индекса.
+"""
+
+import asyncio
+import json
+import sys
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.cache import membership_cache
+from database.connection import init_db, close_db
+from database.repositories import ProjectRepository, RoleRepository, TaskRepository, UserRepository
+
+# Объём тестовых данных
+USERS = 5000
+PROJECTS = 2000
+TASKS = 20000
+
+# Telegram ID тестовых пользователей начинаются после этого значения
+USER_ID_BASE = 9_000_000_000
+
+SEED_SQL = [
+    """
+    INSERT INTO users (telegram_id, username, first_name, is_admin, created_at, updated_at)
+    SELECT CAST(:base AS bigint) + g, 'plan_user_' || g, 'Plan', false, now(), now()
+    FROM generate_series(1, :users) g
+    """,
+    """
+    INSERT INTO projects (name, is_active, created_by, created_at, updated_at,
+                          reminders_enabled, reminder_hour, reminder_minute, reminder_days_before)
+    SELECT 'plan_project_' || g, g % 10 <> 0, CAST(:base AS bigint) + 1, now(), now(),
+           true, g % 24, (g * 7) % 60, 3
+    FROM generate_series(1, :projects) g
+    """,
+    """
+    INSERT INTO project_members (project_id, user_id, role, joined_at)
+    SELECT p.id, CAST(:base AS bigint) + 1 + (g + p.id) % :users,
+           CASE WHEN g = 1 THEN 'projectnik' ELSE 'member' END, now()
+    FROM projects p, generate_series(1, 20) g
+    WHERE p.name LIKE 'plan_project_%'
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO tasks (project_id, title, deadline, status, created_by, created_at, updated_at)
+    SELECT p.id, 'plan_task_' || g,
+           CASE WHEN g % 7 = 0 THEN NULL ELSE now() + (g % 60 - 20) * interval '1 day' END,
+           (ARRAY['pending', 'in_progress', 'completed', 'delayed', 'not_completed'])[1 + g % 5],
+           CAST(:base AS bigint) + 1, now(), now()
+    FROM generate_series(1, :tasks) g
+    JOIN projects p ON p.name = 'plan_project_' || (1 + g % :projects)
+    """,
+    """
+    INSERT INTO task_assignees (task_id, user_id, assigned_at)
+    SELECT t.id, CAST(:base AS bigint) + 1 + t.id % :users, now()
+    FROM tasks t
+    WHERE t.title LIKE 'plan_task_%'
+    ON CONFLICT DO NOTHING
+    """,
+    "ANALYZE users",
+    "ANALYZE projects",
+    "ANALYZE project_members",
+    "ANALYZE tasks",
+    "ANALYZE task_assignees",
+]
+
+
+def _checks(project_id: int, user_id: int, username: str):
+    """Частые запросы: (название, фабрика корутины от сессии)"""
+    return [
+        ("ProjectRepository.get_user_projects",
+         lambda s: ProjectRepository(s).get_user_projects(user_id)),
+        ("ProjectRepository.get_projects_due_for_reminder",
+         lambda s: ProjectRepository(s).get_projects_due_for_reminder(9, 0)),
+        ("ProjectRepository.get_member_role",
+         lambda s: ProjectRepository(s).get_member_role(project_id, user_id)),
+        ("ProjectRepository.get_header",
+         lambda s: ProjectRepository(s).get_header(project_id)),
+        ("ProjectRepository.get_settings",
+         lambda s: ProjectRepository(s).get_settings(project_id)),
+        ("ProjectRepository.get_project_members",
+         lambda s: ProjectRepository(s).get_project_members(project_id)),
+        ("RoleRepository.get_roles_json",
+         lambda s: RoleRepository(s).get_roles_json(project_id)),
+        ("TaskRepository.get_project_tasks_page",
+         lambda s: TaskRepository(s).get_project_tasks_page(project_id)),
+        ("TaskRepository.get_user_tasks_page",
+         lambda s: TaskRepository(s).get_user_tasks_page(user_id)),
+        ("TaskRepository.get_tasks_for_user_reminder",
+         lambda s: TaskRepository(s).get_tasks_for_user_reminder(user_id)),
+        ("TaskRepository.get_reminder_rows",
+         lambda s: TaskRepository(s).get_reminder_rows([project_id])),
+        ("UserRepository.get_by_telegram_id",
+         lambda s: UserRepository(s).get_by_telegram_id(user_id)),
+        ("UserRepository.get_by_username",
+         lambda s: UserRepository(s).get_by_username(username)),
+        ("UserRepository.search_by_username",
+         lambda s: UserRepository(s).search_by_username(username[:-1])),
+    ]
+
+
+# Узлы плана, которые читают индекс
+INDEX_SCANS = ("Index Scan", "Index Only Scan", "Bitmap Index Scan")
+
+
+def _bad_scans(plan: Dict[str, Any]) -> List[str]:
+    """
+    Чтения таблиц без подходящего индекса: Seq Scan и обходы индекса
+    без Index Cond — индекс читается целиком, а условие проверяется фильтром.
+    """
+    found = []
+    node_type = plan.get("Node Type")
+    if node_type == "Seq Scan":
+        found.append(f"Seq Scan on {plan.get('Relation Name', '?')}")
+    elif node_type in INDEX_SCANS and "Index Cond" not in plan:
+        found.append(f"{node_type} on {plan.get('Index Name', '?')} without Index Cond")
+    for child in plan.get("Plans", []):
+        found.extend(_bad_scans(child))
+    return found
+
+
+async def check_query_plans() -> bool:
+    db = await init_db()
+    captured: List[Tuple[str, Any]] = []
+    capturing = False
+    
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if capturing and not statement.lstrip().upper().startswith("EXPLAIN"):
+            captured.append((statement, parameters))
+    
+    event.listen(db.engine.sync_engine, "before_cursor_execute", capture)
+    
+    ok = True
+    async with db.engine.connect() as conn:
+        transaction = await conn.begin()
+        try:
+            params = {"base": USER_ID_BASE, "users": USERS, "projects": PROJECTS, "tasks": TASKS}
+            print("📝 Заполнение тестовыми данными...")
+            for sql in SEED_SQL:
+                await conn.execute(text(sql), params)
+            
+            project_id = (await conn.execute(
+                text("SELECT id FROM projects WHERE name = 'plan_project_1'")
+            )).scalar_one()
+            user_id = (await conn.execute(
+                text("SELECT user_id FROM project_members WHERE project_id = :pid LIMIT 1"),
+                {"pid": project_id},
+            )).scalar_one()
+            username = f"plan_user_{user_id - USER_ID_BASE}"
+            
+            session = AsyncSession(bind=conn)
+            
+            for name, make_query in _checks(project_id, user_id, username):
+                membership_cache.clear()
+                captured.clear()
+                capturing = True
+                try:
+                    await make_query(session)
+                finally:
+                    capturing = False
+                
+                scans = []
+                for statement, parameters in captured:
+                    if "pg_notify" in statement:
+                        continue
+                    result = await conn.exec_driver_sql(
+                        "EXPLAIN (FORMAT JSON) " + statement, parameters
+                    )
+                    plan = result.scalar_one()
+                    if isinstance(plan, str):
+                        plan = json.loads(plan)
+                    scans.extend(_bad_scans(plan[0]["Plan"]))
+                
+                if scans:
+                    ok = False
+                    print(f"❌ {name}: {', '.join(sorted(set(scans)))}")
+                else:
+                    print(f"✅ {name}: запросов {len(captured)}, все чтения по индексу")
+            
+            await session.close()
+        finally:
+            await transaction.rollback()
+            event.remove(db.engine.sync_engine, "before_cursor_execute", capture)
+    
+    await close_db()
+    return ok
+
+
+if __name__ == "__main__":
+    success = asyncio.run(check_query_plans())
+    if not success:
+        print("\n⚠️  Есть запросы без подходящего индекса")
+    sys.exit(0 if success else 1)
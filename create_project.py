@@ -12,7 +12,7 @@ import sys
 import argparse
 from datetime import datetime
 
-from database.connection import get_db_manager
+from database.connection import init_db, close_db
 from database.models import Project, User, ProjectRole
 from bot.config import settings
 
@@ -21,7 +21,7 @@ async def create_project(project_name=None, project_description=None, auto_creat
     """Создать проект с базовыми ролями"""
     
     # Подключение к БД
-    db_manager = get_db_manager()
+    db_manager = await init_db()
     
     try:
         async with db_manager.session() as session:
@@ -95,7 +95,6 @@ async def create_project(project_name=None, project_description=None, auto_creat
                         "can_manage_tasks": True,
                         "can_manage_members": True,
                         "can_manage_settings": True,
-                        "managed_by_role_ids": None
                     },
                     {
                         "name": "⭐ Главный организатор",
@@ -105,7 +104,6 @@ async def create_project(project_name=None, project_description=None, auto_creat
                         "can_manage_tasks": True,
                         "can_manage_members": True,
                         "can_manage_settings": False,
-                        "managed_by_role_ids": None
                     },
                     {
                         "name": "👤 Участник",
@@ -115,7 +113,6 @@ async def create_project(project_name=None, project_description=None, auto_creat
                         "can_manage_tasks": True,
                         "can_manage_members": False,
                         "can_manage_settings": False,
-                        "managed_by_role_ids": None
                     }
                 ]
                 
@@ -146,7 +143,7 @@ async def create_project(project_name=None, project_description=None, auto_creat
         traceback.print_exc()
         sys.exit(1)
     finally:
-        await db_manager.close()
+        await close_db()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,204 @@
+"""Кэш членства в проектах для проверки прав и отметки недавних записей пользователей"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import asyncpg
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Канал PostgreSQL, через который процессы сообщают об изменении членства
+MEMBERSHIP_CHANNEL = "membership_changed"
+
+# Канал, через который процессы сообщают, что пользователь только что изменил данные
+RECENT_WRITE_CHANNEL = "recent_write"
+
+# Задержка перед переподключением слушателя после обрыва
+LISTENER_RECONNECT_SECONDS = 5
+
+
+class CachedMember(NamedTuple):
+    """Роль пользователя в проекте и его итоговые права (битовая маска Permission)"""
+    role: Optional[str]
+    role_id: Optional[int]
+    permissions: int = 0
+
+
+class MembershipCache:
+    """
+    Кэш ролей по (project_id, user_id) с TTL.
+    
+    Отсутствие членства тоже кэшируется (значение None), чтобы повторные
+    нажатия кнопок чужими пользователями не ходили в БД.
+    """
+    
+    _MISSING = object()
+    
+    def __init__(self, ttl: float = 60.0, max_size: int = 50_000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: Dict[Tuple[int, int], Tuple[float, Optional[CachedMember]]] = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, project_id: int, user_id: int):
+        """Вернуть закэшированную роль, None для не-участника или MembershipCache._MISSING"""
+        entry = self._entries.get((project_id, user_id))
+        if entry is None or entry[0] < time.monotonic():
+            self.misses += 1
+            return self._MISSING
+        self.hits += 1
+        return entry[1]
+    
+    def set(self, project_id: int, user_id: int, member: Optional[CachedMember]):
+        if self.ttl <= 0:
+            return
+        if len(self._entries) >= self.max_size:
+            self._evict()
+        self._entries[(project_id, user_id)] = (time.monotonic() + self.ttl, member)
+    
+    def _evict(self):
+        now = time.monotonic()
+        for key in [k for k, (expires, _) in self._entries.items() if expires < now]:
+            del self._entries[key]
+        if len(self._entries) >= self.max_size:
+            self._entries.clear()
+    
+    def invalidate(self, project_id: int, user_id: Optional[int] = None):
+        """Сбросить запись пользователя или, без user_id, всего проекта"""
+        if user_id is not None:
+            self._entries.pop((project_id, user_id), None)
+            return
+        for key in [k for k in self._entries if k[0] == project_id]:
+            del self._entries[key]
+    
+    def clear(self):
+        self._entries.clear()
+    
+    @classmethod
+    def is_missing(cls, value) -> bool:
+        return value is cls._MISSING
+
+
+membership_cache = MembershipCache(ttl=settings.membership_cache_ttl)
+
+
+class RecentWrites:
+    """
+    Пользователи, недавно изменявшие данные. Пока отметка действует,
+    их чтения идут на основную БД: реплика могла ещё не получить их изменения.
+    """
+    
+    def __init__(self, ttl: float = 10.0, max_size: int = 50_000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._until: Dict[int, float] = {}
+    
+    def mark(self, user_id: int):
+        if self.ttl <= 0:
+            return
+        if len(self._until) >= self.max_size:
+            now = time.monotonic()
+            for key in [k for k, until in self._until.items() if until < now]:
+                del self._until[key]
+        self._until[user_id] = time.monotonic() + self.ttl
+    
+    def __contains__(self, user_id: int) -> bool:
+        until = self._until.get(user_id)
+        return until is not None and until >= time.monotonic()
+    
+    def clear(self):
+        self._until.clear()
+
+
+recent_writes = RecentWrites(ttl=settings.replica_sticky_seconds)
+
+
+async def invalidate_membership(session: AsyncSession, project_id: int, user_id: Optional[int] = None):
+    """
+    Сбросить кэш членства в этом процессе и оповестить остальные.
+    Уведомление PostgreSQL доставляется после коммита транзакции сессии.
+    """
+    membership_cache.invalidate(project_id, user_id)
+    payload = f"{project_id}:{user_id if user_id is not None else '*'}"
+    await session.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": MEMBERSHIP_CHANNEL, "payload": payload},
+    )
+
+
+async def mark_recent_write(session: AsyncSession, user_id: int):
+    """
+    Отметить запись пользователя в этом процессе и оповестить остальные.
+    Уведомление PostgreSQL доставляется после коммита транзакции сессии.
+    """
+    recent_writes.mark(user_id)
+    await session.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": RECENT_WRITE_CHANNEL, "payload": str(user_id)},
+    )
+
+
+def _on_recent_write(connection, pid, channel, payload: str):
+    try:
+        recent_writes.mark(int(payload))
+    except ValueError:
+        logger.warning(f"Invalid recent write notification: {payload}")
+
+
+def _on_membership_changed(connection, pid, channel, payload: str):
+    try:
+        project_id, user_id = payload.split(":", 1)
+        membership_cache.invalidate(int(project_id), None if user_id == "*" else int(user_id))
+    except ValueError:
+        logger.warning(f"Invalid membership notification: {payload}")
+
+
+_listener_task: Optional[asyncio.Task] = None
+
+
+async def _listen_membership_changes():
+    while True:
+        connection = None
+        try:
+            connection = await asyncpg.connect(settings.database_url_sync)
+            await connection.add_listener(MEMBERSHIP_CHANNEL, _on_membership_changed)
+            await connection.add_listener(RECENT_WRITE_CHANNEL, _on_recent_write)
+            # Пока слушатель был отключён, уведомления могли потеряться
+            membership_cache.clear()
+            logger.info("Listening for membership changes")
+            while not connection.is_closed():
+                await asyncio.sleep(LISTENER_RECONNECT_SECONDS)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Membership listener error: {e}")
+        finally:
+            if connection is not None and not connection.is_closed():
+                await connection.close()
+        await asyncio.sleep(LISTENER_RECONNECT_SECONDS)
+
+
+def start_membership_listener():
+    """Запустить приём уведомлений об изменении членства и записях пользователей из других процессов"""
+    global _listener_task
+    if _listener_task is None or _listener_task.done():
+        _listener_task = asyncio.create_task(_listen_membership_changes())
+
+
+async def stop_membership_listener():
+    """Остановить приём уведомлений"""
+    global _listener_task
+    if _listener_task is not None:
+        _listener_task.cancel()
+        try:
+            await _listener_task
+        except asyncio.CancelledError:
+            pass
+        _listener_task = None
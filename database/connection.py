@@ -1,39 +1,175 @@
 import logging
+import time
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import AsyncGenerator, Dict, Optional
 
+from sqlalchemy import event, exc
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from bot.config import settings
+from database.cache import recent_writes
 
 logger = logging.getLogger(__name__)
 
+# Открытая в текущем контексте пишущая сессия: чтения внутри неё идут через неё же
+_write_session: ContextVar[Optional[AsyncSession]] = ContextVar("write_session", default=None)
+
+
+class _PrimarySession(Session):
+    """
+    Сессия основной БД. В info отмечает запись: has_written — писали хотя бы раз
+    (остаётся и после коммита), pending_writes — есть незакоммиченная запись
+    """
+
+
+def _mark_written(session: Session):
+    session.info["has_written"] = True
+    session.info["pending_writes"] = True
+
+
+@event.listens_for(_PrimarySession, "after_flush")
+def _on_flush(session, flush_context):
+    _mark_written(session)
+
+
+@event.listens_for(_PrimarySession, "do_orm_execute")
+def _on_execute(orm_execute_state):
+    # INSERT/UPDATE/DELETE и текстовый SQL считаются записью
+    if not orm_execute_state.is_select:
+        _mark_written(orm_execute_state.session)
+
+
+@event.listens_for(_PrimarySession, "after_commit")
+@event.listens_for(_PrimarySession, "after_rollback")
+def _on_transaction_end(session):
+    session.info.pop("pending_writes", None)
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Пул соединений, который считает время получения соединения и таймауты"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.acquisitions = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.timeouts = 0
+    
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.acquisitions += 1
+            self.wait_time_total += elapsed
+            self.wait_time_max = max(self.wait_time_max, elapsed)
+
+
+@dataclass(frozen=True)
+class PoolStats:
+    """Снимок состояния пула соединений"""
+    size: int
+    max_overflow: int
+    checked_out: int
+    checked_in: int
+    overflow: int
+    acquisitions: int
+    wait_time_avg_ms: float
+    wait_time_max_ms: float
+    timeouts: int
+    
+    def as_dict(self) -> Dict[str, float]:
+        return asdict(self)
+
+
+def _create_engine(url: str) -> AsyncEngine:
+    """Движок с пулом соединений по настройкам DB_POOL_*"""
+    return create_async_engine(
+        url,
+        echo=False,
+        poolclass=InstrumentedPool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args={
+            # Кэш подготовленных выражений asyncpg и SQLAlchemy;
+            # 0 — для PgBouncer в режиме transaction
+            "statement_cache_size": settings.db_statement_cache_size,
+            "prepared_statement_cache_size": settings.db_statement_cache_size,
+        },
+    )
+
+
+def _pool_stats(engine: AsyncEngine) -> PoolStats:
+    pool = engine.sync_engine.pool
+    acquisitions = pool.acquisitions
+    return PoolStats(
+        size=pool.size(),
+        max_overflow=pool._max_overflow,
+        checked_out=pool.checkedout(),
+        checked_in=pool.checkedin(),
+        overflow=max(pool.overflow(), 0),
+        acquisitions=acquisitions,
+        wait_time_avg_ms=round(pool.wait_time_total / acquisitions * 1000, 3) if acquisitions else 0.0,
+        wait_time_max_ms=round(pool.wait_time_max * 1000, 3),
+        timeouts=pool.timeouts,
+    )
+
 
 class DatabaseManager:
-    """Менеджер подключения к базе данных"""
+    """
+    Менеджер подключения к базе данных.
+    
+    session() — запись и чтение на основной БД. read_session() — только чтение
+    на реплике (POSTGRES_REPLICA_HOST); без реплики чтения идут на основную БД.
+    """
     
     def __init__(self):
-        self.engine = create_async_engine(
-            settings.database_url,
-            echo=False,
-            pool_pre_ping=True,
-            pool_size=10,
-            max_overflow=20,
-        )
+        self.engine = _create_engine(settings.database_url)
+        self.replica_engine: Optional[AsyncEngine] = None
+        if settings.database_replica_url:
+            self.replica_engine = _create_engine(settings.database_replica_url)
+        
         self.session_factory = async_sessionmaker(
             self.engine,
             class_=AsyncSession,
+            sync_session_class=_PrimarySession,
+            expire_on_commit=False,
+        )
+        # Транзакции на чтение открываются как READ ONLY, случайная запись завершится ошибкой
+        self.primary_read_session_factory = async_sessionmaker(
+            self.engine.execution_options(postgresql_readonly=True),
+            class_=AsyncSession,
             expire_on_commit=False,
         )
+        self.read_session_factory = self.primary_read_session_factory
+        if self.replica_engine is not None:
+            self.read_session_factory = async_sessionmaker(
+                self.replica_engine.execution_options(postgresql_readonly=True),
+                class_=AsyncSession,
+                expire_on_commit=False,
+            )
     
     @asynccontextmanager
     async def session(self) -> AsyncGenerator[AsyncSession, None]:
         """Контекстный менеджер для сессии"""
         async with self.session_factory() as session:
+            token = _write_session.set(session)
             try:
                 yield session
                 await session.commit()
@@ -41,30 +177,91 @@ class DatabaseManager:
                 await session.rollback()
                 logger.error(f"Database session error: {e}")
                 raise
+            finally:
+                _write_session.reset(token)
+    
+    @asynccontextmanager
+    async def read_session(self, user_id: Optional[int] = None) -> AsyncGenerator[AsyncSession, None]:
+        """
+        Сессия только для чтения, по возможности на реплике.
+        Внутри session() с уже начатой транзакцией или после записи через неё
+        (в том числе закоммиченной) возвращает её же, чтобы чтение видело свои
+        изменения, даже если они ещё не дошли до реплики. Чтения пользователя
+        user_id, недавно изменявшего данные (mark_recent_write), идут на основную БД.
+        """
+        current = _write_session.get()
+        if current is not None and (current.in_transaction() or current.info.get("has_written")):
+            yield current
+            return
+        
+        factory = self.read_session_factory
+        if user_id is not None and user_id in recent_writes:
+            factory = self.primary_read_session_factory
+        
+        async with factory() as session:
+            try:
+                yield session
+            except Exception as e:
+                logger.error(f"Database read session error: {e}")
+                raise
+    
+    def pool_stats(self, replica: bool = False) -> Optional[PoolStats]:
+        """Текущая загрузка пула и время ожидания соединений (None, если реплика не настроена)"""
+        engine = self.replica_engine if replica else self.engine
+        return _pool_stats(engine) if engine is not None else None
+    
+    def pool_stats_report(self) -> Dict[str, Optional[Dict[str, float]]]:
+        """Статистика пулов основной БД и реплики для отдачи в API"""
+        replica = self.pool_stats(replica=True)
+        return {
+            "primary": self.pool_stats().as_dict(),
+            "replica": replica.as_dict() if replica else None,
+        }
     
     async def close(self):
         """Закрытие подключения"""
+        logger.info(f"Database pool stats: {self.pool_stats_report()}")
         await self.engine.dispose()
+        if self.replica_engine is not None:
+            await self.replica_engine.dispose()
         logger.info("Database connection closed")
 
 
-# Глобальный экземпляр
+async def release_read_transaction():
+    """
+    Завершить транзакцию сессии текущего контекста, если в ней только читали:
+    соединение возвращается в пул, следующий запрос начнёт новую транзакцию.
+    Транзакции с незакоммиченной записью не трогаются.
+    """
+    session = _write_session.get()
+    if session is None or not session.in_transaction():
+        return
+    if session.info.get("pending_writes") or session.new or session.dirty or session.deleted:
+        return
+    await session.commit()
+
+
+# Единственный экземпляр на процесс; создаётся init_db() при запуске бота или веб-приложения
 _db_manager: DatabaseManager | None = None
 
 
 def get_db_manager() -> DatabaseManager:
     """Получить менеджер БД"""
-    global _db_manager
     if _db_manager is None:
-        _db_manager = DatabaseManager()
+        raise RuntimeError("Database is not initialized: call init_db() first")
     return _db_manager
 
 
-async def init_db():
-    """Инициализация БД"""
+async def init_db() -> DatabaseManager:
+    """Инициализация БД. Повторный вызов возвращает уже созданный менеджер"""
     global _db_manager
-    _db_manager = DatabaseManager()
-    logger.info("Database manager initialized")
+    if _db_manager is None:
+        _db_manager = DatabaseManager()
+        logger.info(
+            f"Database manager initialized "
+            f"(pool size: {settings.db_pool_size}, max overflow: {settings.db_max_overflow}, "
+            f"replica: {settings.postgres_replica_host or 'none'})"
+        )
     return _db_manager
 
 
@@ -74,4 +271,3 @@ async def close_db():
     if _db_manager:
         await _db_manager.close()
         _db_manager = None
-
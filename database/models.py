@@ -139,7 +139,7 @@ class ProjectRole(Base):
     can_manage_tasks: Mapped[bool] = mapped_column(Boolean, default=True)  # Может управлять задачами
     can_manage_members: Mapped[bool] = mapped_column(Boolean, default=False)  # Может управлять участниками
     can_manage_settings: Mapped[bool] = mapped_column(Boolean, default=False)  # Может управлять настройками
-    managed_by_role_ids: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # JSON список ID ролей, которые управляют этой ролью
+    max_members: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # Лимит участников (None = без ограничений)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     
     # Отношения
@@ -147,6 +147,37 @@ class ProjectRole(Base):
     members: Mapped[List["ProjectMember"]] = relationship(back_populates="role_obj")
 
 
+class ProjectRoleManager(Base):
+    """Ребро иерархии ролей: manager_role_id управляет role_id"""
+    __tablename__ = "project_role_managers"
+    
+    project_id: Mapped[int] = mapped_column(Integer, ForeignKey("projects.id", ondelete="CASCADE"))
+    manager_role_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("project_roles.id", ondelete="CASCADE"), primary_key=True
+    )
+    role_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("project_roles.id", ondelete="CASCADE"), primary_key=True
+    )
+
+
+class ProjectRoleClosure(Base):
+    """
+    Транзитивное замыкание иерархии ролей: ancestor_id управляет descendant_id
+    напрямую (depth = 1) или через промежуточные роли. Пересчитывается
+    RoleRepository при изменении иерархии проекта.
+    """
+    __tablename__ = "project_role_closure"
+    
+    project_id: Mapped[int] = mapped_column(Integer, ForeignKey("projects.id", ondelete="CASCADE"))
+    ancestor_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("project_roles.id", ondelete="CASCADE"), primary_key=True
+    )
+    descendant_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("project_roles.id", ondelete="CASCADE"), primary_key=True
+    )
+    depth: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
 class ProjectMember(Base):
     """Участник проекта с ролью"""
     __tablename__ = "project_members"
@@ -211,3 +242,26 @@ class TaskAssignee(Base):
     task: Mapped["Task"] = relationship(back_populates="assignees")
     user: Mapped["User"] = relationship(back_populates="assigned_tasks")
 
+
+class FsmRecord(Base):
+    """Сохранённое состояние FSM диалога пользователя"""
+    __tablename__ = "fsm_states"
+    
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    state: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    data: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # JSON
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class OutboxMessage(Base):
+    """Исходящее сообщение в Telegram, ожидающее отправки диспетчером"""
+    __tablename__ = "outbox"
+    
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    chat_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    text: Mapped[str] = mapped_column(Text, nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    available_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)  # Не отправлять раньше этого времени
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    delivered_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    failed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)  # Попытки исчерпаны
@@ -0,0 +1,43 @@
+"""Права участников проекта в виде битовой маски"""
+
+from enum import IntFlag
+from typing import Dict, Optional
+
+from database.models import RoleType
+
+
+class Permission(IntFlag):
+    """Права в проекте; соответствуют флагам can_manage_* динамической роли"""
+    NONE = 0
+    MANAGE_ROLES = 1
+    MANAGE_TASKS = 2
+    MANAGE_MEMBERS = 4
+    MANAGE_SETTINGS = 8
+    ALL = MANAGE_ROLES | MANAGE_TASKS | MANAGE_MEMBERS | MANAGE_SETTINGS
+
+
+# Права старых ролей (ProjectMember.role)
+LEGACY_ROLE_PERMISSIONS: Dict[str, Permission] = {
+    RoleType.PROJECTNIK.value: Permission.ALL,
+    RoleType.MAIN_ORGANIZER.value: Permission.ALL,
+}
+
+
+def compile_permissions(
+    role: Optional[str],
+    can_manage_roles: Optional[bool] = False,
+    can_manage_tasks: Optional[bool] = False,
+    can_manage_members: Optional[bool] = False,
+    can_manage_settings: Optional[bool] = False,
+) -> Permission:
+    """Итоговые права участника: объединение прав старой роли и флагов динамической роли"""
+    permissions = LEGACY_ROLE_PERMISSIONS.get(role, Permission.NONE)
+    if can_manage_roles:
+        permissions |= Permission.MANAGE_ROLES
+    if can_manage_tasks:
+        permissions |= Permission.MANAGE_TASKS
+    if can_manage_members:
+        permissions |= Permission.MANAGE_MEMBERS
+    if can_manage_settings:
+        permissions |= Permission.MANAGE_SETTINGS
+    return permissions
@@ -1,6 +1,7 @@
 from database.repositories.user import UserRepository
 from database.repositories.project import ProjectRepository
 from database.repositories.task import TaskRepository
+from database.repositories.role import RoleRepository
+from database.repositories.outbox import OutboxRepository
 
-__all__ = ["UserRepository", "ProjectRepository", "TaskRepository"]
-
+__all__ = ["UserRepository", "ProjectRepository", "TaskRepository", "RoleRepository", "OutboxRepository"]
@@ -0,0 +1,117 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterable, List, Tuple
+
+from sqlalchemy import select, update, delete, insert, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import OutboxMessage
+
+
+@dataclass(frozen=True)
+class OutboxItem:
+    """Захваченное на отправку сообщение"""
+    id: int
+    chat_id: int
+    text: str
+    attempts: int
+
+
+class OutboxRepository:
+    """
+    Репозиторий исходящих сообщений.
+    
+    Сообщения добавляются в той же транзакции, что и изменение данных,
+    поэтому уведомление не теряется при сбое и не уходит при откате.
+    """
+    
+    def __init__(self, session: AsyncSession):
+        self.session = session
+    
+    async def add(self, chat_id: int, text: str):
+        """Поставить сообщение в очередь на отправку"""
+        await self.add_many([(chat_id, text)])
+    
+    async def add_many(self, messages: Iterable[Tuple[int, str]]) -> int:
+        """Поставить пачку сообщений (chat_id, text) одним запросом. Возвращает их количество"""
+        now = datetime.utcnow()
+        rows = [
+            {"chat_id": chat_id, "text": text, "available_at": now, "created_at": now}
+            for chat_id, text in messages
+        ]
+        if rows:
+            await self.session.execute(insert(OutboxMessage), rows)
+        return len(rows)
+    
+    async def claim_batch(self, limit: int, lease_seconds: float) -> List[OutboxItem]:
+        """
+        Захватить до limit готовых к отправке сообщений.
+        
+        Строки выбираются с FOR UPDATE SKIP LOCKED, поэтому параллельные
+        диспетчеры получают разные сообщения. Захват — это перенос available_at
+        на время аренды: если диспетчер упадёт, не отметив результат,
+        сообщение снова станет доступно после её окончания.
+        """
+        now = datetime.utcnow()
+        pending = (
+            select(OutboxMessage.id)
+            .where(
+                and_(
+                    OutboxMessage.delivered_at.is_(None),
+                    OutboxMessage.failed_at.is_(None),
+                    OutboxMessage.available_at <= now,
+                )
+            )
+            .order_by(OutboxMessage.available_at, OutboxMessage.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await self.session.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id.in_(pending.scalar_subquery()))
+            .values(
+                available_at=now + timedelta(seconds=lease_seconds),
+                attempts=OutboxMessage.attempts + 1,
+            )
+            .returning(OutboxMessage.id, OutboxMessage.chat_id, OutboxMessage.text, OutboxMessage.attempts)
+        )
+        items = [OutboxItem(*row) for row in result.all()]
+        items.sort(key=lambda item: item.id)
+        return items
+    
+    async def mark_delivered(self, ids: List[int]):
+        """Отметить сообщения отправленными. Повторная отметка ничего не меняет"""
+        if not ids:
+            return
+        await self.session.execute(
+            update(OutboxMessage)
+            .where(and_(OutboxMessage.id.in_(ids), OutboxMessage.delivered_at.is_(None)))
+            .values(delivered_at=datetime.utcnow())
+        )
+    
+    async def retry_later(self, ids: List[int], retry_at: datetime):
+        """Отложить повторную отправку до retry_at"""
+        if not ids:
+            return
+        await self.session.execute(
+            update(OutboxMessage)
+            .where(and_(OutboxMessage.id.in_(ids), OutboxMessage.delivered_at.is_(None)))
+            .values(available_at=retry_at)
+        )
+    
+    async def mark_failed(self, ids: List[int]):
+        """Прекратить попытки отправки"""
+        if not ids:
+            return
+        await self.session.execute(
+            update(OutboxMessage)
+            .where(and_(OutboxMessage.id.in_(ids), OutboxMessage.delivered_at.is_(None)))
+            .values(failed_at=datetime.utcnow())
+        )
+    
+    async def purge_delivered(self, older_than: timedelta) -> int:
+        """Удалить давно отправленные сообщения. Возвращает количество удалённых"""
+        result = await self.session.execute(
+            delete(OutboxMessage).where(OutboxMessage.delivered_at < datetime.utcnow() - older_than)
+        )
+        return result.rowcount
@@ -1,10 +1,47 @@
-from typing import Optional, List
+from dataclasses import dataclass
+from typing import Iterable, Optional, List, Set, Tuple
 
-from sqlalchemy import select, and_
+from sqlalchemy import select, update, func, and_, Row
 from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.models import Project, ProjectMember, User, RoleType, ROLE_LIMITS
+from database.models import Project, ProjectMember, ProjectRole, Task, User, RoleType, ROLE_LIMITS
+from database.cache import CachedMember, MembershipCache, membership_cache, invalidate_membership
+from database.permissions import Permission, compile_permissions
+
+# Пространство ключей pg_advisory_xact_lock для изменений состава проекта
+MEMBERSHIP_LOCK_NAMESPACE = 1
+
+
+@dataclass(frozen=True)
+class ProjectHeader:
+    """Заголовок проекта для меню: без связей, со счётчиками"""
+    id: int
+    name: str
+    description: Optional[str]
+    member_count: int
+    task_count: int
+
+
+@dataclass(frozen=True)
+class ProjectSettings:
+    """Настройки напоминаний проекта"""
+    id: int
+    name: str
+    reminders_enabled: bool
+    reminder_hour: int
+    reminder_minute: int
+    reminder_days_before: int
+
+
+_SETTINGS_COLUMNS = (
+    Project.id,
+    Project.name,
+    Project.reminders_enabled,
+    Project.reminder_hour,
+    Project.reminder_minute,
+    Project.reminder_days_before,
+)
 
 
 class ProjectRepository:
@@ -36,6 +73,7 @@ class ProjectRepository:
         )
         self.session.add(member)
         await self.session.flush()
+        await invalidate_membership(self.session, project.id, created_by)
         
         return project
     
@@ -49,6 +87,67 @@ class ProjectRepository:
         )
         return result.scalar_one_or_none()
     
+    async def get_header(self, project_id: int) -> Optional[ProjectHeader]:
+        """Получить название, описание и счётчики проекта без загрузки участников и задач"""
+        member_count = (
+            select(func.count(ProjectMember.id))
+            .where(ProjectMember.project_id == Project.id)
+            .scalar_subquery()
+        )
+        task_count = (
+            select(func.count(Task.id))
+            .where(Task.project_id == Project.id)
+            .scalar_subquery()
+        )
+        result = await self.session.execute(
+            select(Project.id, Project.name, Project.description, member_count, task_count)
+            .where(Project.id == project_id)
+        )
+        row = result.one_or_none()
+        return ProjectHeader(*row) if row else None
+    
+    async def get_settings(self, project_id: int) -> Optional[ProjectSettings]:
+        """Получить настройки напоминаний проекта"""
+        result = await self.session.execute(
+            select(*_SETTINGS_COLUMNS).where(Project.id == project_id)
+        )
+        row = result.one_or_none()
+        return ProjectSettings(*row) if row else None
+    
+    async def update_reminder_settings(
+        self,
+        project_id: int,
+        hour: Optional[int] = None,
+        minute: Optional[int] = None,
+        days_before: Optional[int] = None,
+        toggle: bool = False,
+    ) -> Optional[ProjectSettings]:
+        """
+        Изменить настройки напоминаний одним UPDATE ... RETURNING.
+        toggle=True переключает reminders_enabled.
+        Возвращает новые настройки или None, если проект не найден.
+        """
+        values = {}
+        if hour is not None:
+            values[Project.reminder_hour] = hour
+        if minute is not None:
+            values[Project.reminder_minute] = minute
+        if days_before is not None:
+            values[Project.reminder_days_before] = days_before
+        if toggle:
+            values[Project.reminders_enabled] = ~Project.reminders_enabled
+        if not values:
+            return await self.get_settings(project_id)
+        
+        result = await self.session.execute(
+            update(Project)
+            .where(Project.id == project_id)
+            .values(values)
+            .returning(*_SETTINGS_COLUMNS)
+        )
+        row = result.one_or_none()
+        return ProjectSettings(*row) if row else None
+    
     async def get_active_projects(self) -> List[Project]:
         """Получить все активные проекты"""
         result = await self.session.execute(
@@ -59,6 +158,38 @@ class ProjectRepository:
         )
         return list(result.scalars().all())
     
+    async def get_projects_due_for_reminder(self, hour: int, minute: int) -> List[int]:
+        """
+        Получить ID активных проектов с включёнными напоминаниями
+        на указанное время (использует индекс idx_projects_reminder_slot)
+        """
+        result = await self.session.execute(
+            select(Project.id).where(
+                and_(
+                    Project.is_active == True,
+                    Project.reminders_enabled == True,
+                    Project.reminder_hour == hour,
+                    Project.reminder_minute == minute,
+                )
+            )
+        )
+        return list(result.scalars().all())
+    
+    async def get_reminder_schedule(self) -> List[Row]:
+        """
+        Получить расписание напоминаний: (id, reminder_hour, reminder_minute)
+        для активных проектов с включёнными напоминаниями
+        """
+        result = await self.session.execute(
+            select(Project.id, Project.reminder_hour, Project.reminder_minute).where(
+                and_(
+                    Project.is_active == True,
+                    Project.reminders_enabled == True,
+                )
+            )
+        )
+        return list(result.all())
+    
     async def get_user_projects(self, telegram_id: int) -> List[Project]:
         """Получить проекты пользователя"""
         result = await self.session.execute(
@@ -96,20 +227,9 @@ class ProjectRepository:
         if existing.scalar_one_or_none():
             return None, "Пользователь уже является участником проекта"
         
-        # Проверяем лимит ролей
-        limit = ROLE_LIMITS.get(role)
-        if limit is not None:
-            count_result = await self.session.execute(
-                select(ProjectMember).where(
-                    and_(
-                        ProjectMember.project_id == project_id,
-                        ProjectMember.role == role.value,
-                    )
-                )
-            )
-            current_count = len(count_result.scalars().all())
-            if current_count >= limit:
-                return None, f"Достигнут лимит для роли ({limit})"
+        error = await self.check_role_limit(project_id, ROLE_LIMITS.get(role), role=role)
+        if error:
+            return None, error
         
         member = ProjectMember(
             project_id=project_id,
@@ -118,6 +238,7 @@ class ProjectRepository:
         )
         self.session.add(member)
         await self.session.flush()
+        await invalidate_membership(self.session, project_id, user_id)
         return member, ""
     
     async def remove_member(self, project_id: int, user_id: int) -> bool:
@@ -133,6 +254,7 @@ class ProjectRepository:
         member = result.scalar_one_or_none()
         if member:
             await self.session.delete(member)
+            await invalidate_membership(self.session, project_id, user_id)
             return True
         return False
     
@@ -155,24 +277,57 @@ class ProjectRepository:
         if not member:
             return None, "Участник не найден"
         
-        # Проверяем лимит новой роли
-        limit = ROLE_LIMITS.get(new_role)
-        if limit is not None:
-            count_result = await self.session.execute(
-                select(ProjectMember).where(
-                    and_(
-                        ProjectMember.project_id == project_id,
-                        ProjectMember.role == new_role.value,
-                    )
-                )
-            )
-            current_count = len(count_result.scalars().all())
-            if current_count >= limit:
-                return None, f"Достигнут лимит для роли ({limit})"
+        error = await self.check_role_limit(
+            project_id,
+            ROLE_LIMITS.get(new_role),
+            role=new_role,
+            exclude_user_id=user_id,
+        )
+        if error:
+            return None, error
         
         member.role = new_role.value
+        await invalidate_membership(self.session, project_id, user_id)
         return member, ""
     
+    async def check_role_limit(
+        self,
+        project_id: int,
+        limit: Optional[int],
+        role: Optional[RoleType] = None,
+        role_id: Optional[int] = None,
+        exclude_user_id: Optional[int] = None,
+    ) -> str:
+        """
+        Проверить лимит роли перед назначением. Возвращает текст ошибки или "".
+        
+        Роль задаётся старым значением role или ID динамической роли role_id.
+        Проверка берёт блокировку состава проекта до конца транзакции,
+        поэтому параллельные назначения из бота и веб-панели идут по очереди
+        и не могут вместе превысить лимит.
+        """
+        if limit is None:
+            return ""
+        
+        await self.session.execute(
+            select(func.pg_advisory_xact_lock(MEMBERSHIP_LOCK_NAMESPACE, project_id))
+        )
+        
+        conditions = [ProjectMember.project_id == project_id]
+        if role_id is not None:
+            conditions.append(ProjectMember.role_id == role_id)
+        else:
+            conditions.append(ProjectMember.role == role.value)
+        if exclude_user_id is not None:
+            conditions.append(ProjectMember.user_id != exclude_user_id)
+        
+        current_count = await self.session.scalar(
+            select(func.count()).select_from(ProjectMember).where(and_(*conditions))
+        )
+        if current_count >= limit:
+            return f"Достигнут лимит для роли ({limit})"
+        return ""
+    
     async def get_project_members(self, project_id: int) -> List[ProjectMember]:
         """Получить всех участников проекта"""
         result = await self.session.execute(
@@ -182,6 +337,34 @@ class ProjectRepository:
         )
         return list(result.scalars().all())
     
+    async def get_member_choices(self, project_id: int) -> List[Tuple[int, str]]:
+        """Участники проекта для выбора в клавиатуре: (user_id, имя) без загрузки моделей"""
+        result = await self.session.execute(
+            select(ProjectMember.user_id, User.first_name, User.last_name)
+            .join(User, User.telegram_id == ProjectMember.user_id)
+            .where(ProjectMember.project_id == project_id)
+            .order_by(ProjectMember.joined_at, ProjectMember.user_id)
+        )
+        return [
+            (user_id, f"{first_name} {last_name}" if last_name else first_name)
+            for user_id, first_name, last_name in result.all()
+        ]
+    
+    async def filter_members(self, project_id: int, user_ids: Iterable[int]) -> Set[int]:
+        """Оставить из user_ids только текущих участников проекта"""
+        user_ids = set(user_ids)
+        if not user_ids:
+            return set()
+        result = await self.session.execute(
+            select(ProjectMember.user_id).where(
+                and_(
+                    ProjectMember.project_id == project_id,
+                    ProjectMember.user_id.in_(user_ids),
+                )
+            )
+        )
+        return set(result.scalars().all())
+    
     async def get_member(self, project_id: int, user_id: int) -> Optional[ProjectMember]:
         """Получить участника проекта"""
         result = await self.session.execute(
@@ -196,6 +379,59 @@ class ProjectRepository:
         )
         return result.scalar_one_or_none()
     
+    async def get_member_role(self, project_id: int, user_id: int) -> Optional[CachedMember]:
+        """
+        Получить роль и права участника через кэш. None, если пользователь не участник.
+        Права старой и динамической роли собираются в маску один раз при промахе кэша.
+        """
+        cached = membership_cache.get(project_id, user_id)
+        if not MembershipCache.is_missing(cached):
+            return cached
+        
+        result = await self.session.execute(
+            select(
+                ProjectMember.role,
+                ProjectMember.role_id,
+                ProjectRole.can_manage_roles,
+                ProjectRole.can_manage_tasks,
+                ProjectRole.can_manage_members,
+                ProjectRole.can_manage_settings,
+            )
+            .outerjoin(ProjectRole, ProjectRole.id == ProjectMember.role_id)
+            .where(
+                and_(
+                    ProjectMember.project_id == project_id,
+                    ProjectMember.user_id == user_id,
+                )
+            )
+        )
+        row = result.one_or_none()
+        member = None
+        if row:
+            member = CachedMember(
+                role=row.role,
+                role_id=row.role_id,
+                permissions=int(compile_permissions(
+                    row.role,
+                    row.can_manage_roles,
+                    row.can_manage_tasks,
+                    row.can_manage_members,
+                    row.can_manage_settings,
+                )),
+            )
+        membership_cache.set(project_id, user_id, member)
+        return member
+    
+    async def get_permissions(self, project_id: int, user_id: int) -> Permission:
+        """Итоговые права пользователя в проекте (NONE для не-участника)"""
+        member = await self.get_member_role(project_id, user_id)
+        return Permission(member.permissions) if member else Permission.NONE
+    
+    async def has_permission(self, project_id: int, user_id: int, permission: Permission) -> bool:
+        """Есть ли у пользователя все права из permission"""
+        member = await self.get_member_role(project_id, user_id)
+        return member is not None and member.permissions & permission == permission
+    
     async def deactivate(self, project_id: int) -> bool:
         """Деактивировать проект"""
         project = await self.get_by_id(project_id)
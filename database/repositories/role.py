@@ -0,0 +1,216 @@
+from typing import Iterable, List, Optional
+
+from sqlalchemy import select, delete, func, and_, cast, literal, literal_column, String
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import ProjectMember, ProjectRole, ProjectRoleClosure, ProjectRoleManager, User
+
+# Предел глубины иерархии при пересчёте замыкания (защита от циклов в старых данных)
+MAX_ROLE_DEPTH = 64
+
+# Пространство ключей pg_advisory_xact_lock для изменений иерархии ролей проекта
+# (1 занято составом проекта, см. MEMBERSHIP_LOCK_NAMESPACE)
+ROLE_HIERARCHY_LOCK_NAMESPACE = 2
+
+
+class RoleRepository:
+    """Репозиторий динамических ролей проекта и их иерархии"""
+    
+    def __init__(self, session: AsyncSession):
+        self.session = session
+    
+    async def get_by_id(self, project_id: int, role_id: int) -> Optional[ProjectRole]:
+        """Получить роль проекта по ID"""
+        result = await self.session.execute(
+            select(ProjectRole).where(
+                and_(
+                    ProjectRole.id == role_id,
+                    ProjectRole.project_id == project_id,
+                )
+            )
+        )
+        return result.scalar_one_or_none()
+    
+    async def set_managers(self, role: ProjectRole, manager_ids: Iterable[int]) -> str:
+        """
+        Заменить список ролей, управляющих role, и пересчитать замыкание проекта.
+        Роли других проектов игнорируются. Возвращает текст ошибки или "".
+        """
+        await self._lock_hierarchy(role.project_id)
+        
+        manager_ids = set(manager_ids)
+        if manager_ids:
+            result = await self.session.execute(
+                select(ProjectRole.id).where(
+                    and_(
+                        ProjectRole.project_id == role.project_id,
+                        ProjectRole.id.in_(manager_ids),
+                    )
+                )
+            )
+            manager_ids = set(result.scalars().all())
+        
+        # Управляющая роль не может находиться под управляемой
+        if role.id in manager_ids or manager_ids & set(await self.get_subordinate_ids(role.id)):
+            return "Иерархия ролей не может содержать циклов"
+        
+        await self.session.execute(
+            delete(ProjectRoleManager).where(ProjectRoleManager.role_id == role.id)
+        )
+        if manager_ids:
+            await self.session.execute(
+                insert(ProjectRoleManager)
+                .values([
+                    {"project_id": role.project_id, "manager_role_id": manager_id, "role_id": role.id}
+                    for manager_id in sorted(manager_ids)
+                ])
+                .on_conflict_do_nothing()
+            )
+        await self.rebuild_closure(role.project_id)
+        return ""
+    
+    async def delete(self, role: ProjectRole):
+        """Удалить роль. Пути иерархии через неё исчезают из замыкания"""
+        await self._lock_hierarchy(role.project_id)
+        await self.session.delete(role)
+        await self.session.flush()
+        await self.rebuild_closure(role.project_id)
+    
+    async def _lock_hierarchy(self, project_id: int):
+        """
+        Блокировка иерархии проекта до конца транзакции: параллельные изменения
+        не должны вместе создать цикл или пересчитать замыкание по устаревшим связям
+        """
+        await self.session.execute(
+            select(func.pg_advisory_xact_lock(ROLE_HIERARCHY_LOCK_NAMESPACE, project_id))
+        )
+    
+    async def rebuild_closure(self, project_id: int):
+        """Пересчитать транзитивное замыкание иерархии ролей проекта рекурсивным запросом"""
+        await self.session.execute(
+            delete(ProjectRoleClosure).where(ProjectRoleClosure.project_id == project_id)
+        )
+        
+        edges = ProjectRoleManager
+        paths = (
+            select(
+                edges.manager_role_id.label("ancestor_id"),
+                edges.role_id.label("descendant_id"),
+                literal(1).label("depth"),
+            )
+            .where(edges.project_id == project_id)
+            .cte("paths", recursive=True)
+        )
+        paths = paths.union_all(
+            select(paths.c.ancestor_id, edges.role_id, paths.c.depth + 1)
+            .join(edges, edges.manager_role_id == paths.c.descendant_id)
+            .where(paths.c.depth < MAX_ROLE_DEPTH)
+        )
+        
+        await self.session.execute(
+            insert(ProjectRoleClosure).from_select(
+                ["project_id", "ancestor_id", "descendant_id", "depth"],
+                select(
+                    literal(project_id),
+                    paths.c.ancestor_id,
+                    paths.c.descendant_id,
+                    func.min(paths.c.depth),
+                ).group_by(paths.c.ancestor_id, paths.c.descendant_id),
+            )
+        )
+    
+    async def get_manager_names(self, role_id: int) -> List[str]:
+        """Названия ролей, напрямую управляющих ролью"""
+        result = await self.session.execute(
+            select(ProjectRole.name)
+            .join(ProjectRoleManager, ProjectRoleManager.manager_role_id == ProjectRole.id)
+            .where(ProjectRoleManager.role_id == role_id)
+            .order_by(ProjectRole.level, ProjectRole.id)
+        )
+        return list(result.scalars().all())
+    
+    async def get_superior_ids(self, role_id: int) -> List[int]:
+        """ID всех ролей, управляющих ролью напрямую или через промежуточные"""
+        result = await self.session.execute(
+            select(ProjectRoleClosure.ancestor_id).where(ProjectRoleClosure.descendant_id == role_id)
+        )
+        return list(result.scalars().all())
+    
+    async def get_subordinate_ids(self, role_id: int) -> List[int]:
+        """ID всех ролей под управлением роли, включая косвенное"""
+        result = await self.session.execute(
+            select(ProjectRoleClosure.descendant_id).where(ProjectRoleClosure.ancestor_id == role_id)
+        )
+        return list(result.scalars().all())
+    
+    async def get_roles_json(self, project_id: int) -> str:
+        """
+        Роли проекта с участниками одним запросом, уже сериализованные в JSON.
+        
+        Участники группируются под ролями через json_agg, документ целиком
+        собирается в PostgreSQL — приложение отдаёт его без разбора и кодирования.
+        """
+        empty = literal_column("'[]'::json")
+        member = func.json_build_object(
+            "id", ProjectMember.user_id,
+            "name", func.concat_ws(" ", User.first_name, func.nullif(User.last_name, "")),
+            "username", User.username,
+        )
+        members = func.coalesce(
+            func.json_agg(
+                aggregate_order_by(member, ProjectMember.joined_at, ProjectMember.user_id)
+            ).filter(ProjectMember.id.isnot(None)),
+            empty,
+        )
+        managed_by = (
+            select(
+                func.coalesce(
+                    func.json_agg(
+                        aggregate_order_by(ProjectRoleManager.manager_role_id, ProjectRoleManager.manager_role_id)
+                    ),
+                    empty,
+                )
+            )
+            .where(ProjectRoleManager.role_id == ProjectRole.id)
+            .scalar_subquery()
+        )
+        
+        roles = (
+            select(
+                ProjectRole.id,
+                ProjectRole.level,
+                func.json_build_object(
+                    "id", ProjectRole.id,
+                    "name", ProjectRole.name,
+                    "description", ProjectRole.description,
+                    "level", ProjectRole.level,
+                    "can_manage_roles", ProjectRole.can_manage_roles,
+                    "can_manage_tasks", ProjectRole.can_manage_tasks,
+                    "can_manage_members", ProjectRole.can_manage_members,
+                    "can_manage_settings", ProjectRole.can_manage_settings,
+                    "max_members", ProjectRole.max_members,
+                    "managed_by", managed_by,
+                    "members", members,
+                ).label("role"),
+            )
+            .select_from(ProjectRole)
+            .outerjoin(ProjectMember, ProjectMember.role_id == ProjectRole.id)
+            .outerjoin(User, User.telegram_id == ProjectMember.user_id)
+            .where(ProjectRole.project_id == project_id)
+            .group_by(ProjectRole.id)
+            .subquery()
+        )
+        
+        result = await self.session.execute(
+            select(
+                cast(
+                    func.coalesce(
+                        func.json_agg(aggregate_order_by(roles.c.role, roles.c.level, roles.c.id)),
+                        empty,
+                    ),
+                    String,
+                )
+            )
+        )
+        return result.scalar_one()
@@ -1,11 +1,53 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional, List
+from typing import Iterable, Optional, List, Set, Tuple
 
-from sqlalchemy import select, and_, or_
+from sqlalchemy import select, delete, and_, or_, func, literal, DateTime, Row, Select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.models import Task, TaskAssignee, TaskStatus, User
+from database.models import Project, Task, TaskAssignee, TaskStatus, User
+
+# Задач на одной странице списка
+TASKS_PAGE_SIZE = 10
+
+# Позиция в списке задач: (deadline, id) последней/первой задачи страницы
+TaskCursor = Tuple[Optional[datetime], int]
+
+
+@dataclass(frozen=True)
+class TaskPage:
+    """Страница списка задач с курсорами соседних страниц"""
+    tasks: List[Task]
+    next_cursor: Optional[TaskCursor] = None
+    prev_cursor: Optional[TaskCursor] = None
+
+
+def _after(cursor: TaskCursor):
+    """Задачи после курсора в порядке (deadline ASC NULLS LAST, id ASC)"""
+    deadline, task_id = cursor
+    if deadline is None:
+        return and_(Task.deadline.is_(None), Task.id > task_id)
+    return or_(
+        Task.deadline > deadline,
+        and_(Task.deadline == deadline, Task.id > task_id),
+        Task.deadline.is_(None),
+    )
+
+
+def _before(cursor: TaskCursor):
+    """Задачи перед курсором в том же порядке"""
+    deadline, task_id = cursor
+    if deadline is None:
+        return or_(
+            Task.deadline.isnot(None),
+            and_(Task.deadline.is_(None), Task.id < task_id),
+        )
+    return or_(
+        Task.deadline < deadline,
+        and_(Task.deadline == deadline, Task.id < task_id),
+    )
 
 
 class TaskRepository:
@@ -34,16 +76,8 @@ class TaskRepository:
         self.session.add(task)
         await self.session.flush()
         
-        # Добавляем ответственных
         if assignee_ids:
-            for user_id in assignee_ids:
-                assignee = TaskAssignee(
-                    task_id=task.id,
-                    user_id=user_id,
-                )
-                self.session.add(assignee)
-        
-        await self.session.flush()
+            await self.set_assignees(task.id, assignee_ids)
         return task
     
     async def get_by_id(self, task_id: int) -> Optional[Task]:
@@ -98,6 +132,79 @@ class TaskRepository:
         result = await self.session.execute(query)
         return list(result.scalars().all())
     
+    async def _fetch_page(
+        self,
+        query: Select,
+        cursor: Optional[TaskCursor],
+        backward: bool,
+        limit: int,
+    ) -> TaskPage:
+        """
+        Выбрать одну страницу по ключу (deadline, id).
+        backward=True — страница перед cursor, иначе после него.
+        """
+        if backward and cursor is not None:
+            query = query.where(_before(cursor)).order_by(
+                Task.deadline.desc().nullsfirst(), Task.id.desc()
+            )
+        else:
+            if cursor is not None:
+                query = query.where(_after(cursor))
+            query = query.order_by(Task.deadline.asc().nullslast(), Task.id.asc())
+        
+        # Лишняя строка показывает, есть ли ещё задачи в этом направлении
+        result = await self.session.execute(query.limit(limit + 1))
+        tasks = list(result.scalars().all())
+        has_more = len(tasks) > limit
+        tasks = tasks[:limit]
+        
+        if backward and cursor is not None:
+            tasks.reverse()
+            has_prev, has_next = has_more, True
+        else:
+            has_prev, has_next = cursor is not None, has_more
+        
+        if not tasks:
+            return TaskPage(tasks=[])
+        return TaskPage(
+            tasks=tasks,
+            next_cursor=(tasks[-1].deadline, tasks[-1].id) if has_next else None,
+            prev_cursor=(tasks[0].deadline, tasks[0].id) if has_prev else None,
+        )
+    
+    async def get_project_tasks_page(
+        self,
+        project_id: int,
+        cursor: Optional[TaskCursor] = None,
+        backward: bool = False,
+        limit: int = TASKS_PAGE_SIZE,
+    ) -> TaskPage:
+        """Получить страницу задач проекта, отсортированных по дедлайну"""
+        query = select(Task).where(Task.project_id == project_id)
+        return await self._fetch_page(query, cursor, backward, limit)
+    
+    async def get_user_tasks_page(
+        self,
+        telegram_id: int,
+        cursor: Optional[TaskCursor] = None,
+        backward: bool = False,
+        limit: int = TASKS_PAGE_SIZE,
+        exclude_completed: bool = True,
+    ) -> TaskPage:
+        """
+        Получить страницу задач пользователя, отсортированных по дедлайну
+        (просроченные идут первыми, задачи без дедлайна — последними)
+        """
+        query = (
+            select(Task)
+            .join(TaskAssignee)
+            .options(selectinload(Task.project))
+            .where(TaskAssignee.user_id == telegram_id)
+        )
+        if exclude_completed:
+            query = query.where(Task.status != TaskStatus.COMPLETED.value)
+        return await self._fetch_page(query, cursor, backward, limit)
+    
     async def get_pending_tasks_with_deadline(
         self,
         days_before: int = 3,
@@ -181,6 +288,29 @@ class TaskRepository:
         await self.session.flush()
         return assignee
     
+    async def set_assignees(self, task_id: int, user_ids: Iterable[int]) -> Set[int]:
+        """
+        Заменить набор ответственных задачи.
+        
+        Разница применяется двумя запросами независимо от размера набора:
+        DELETE тех, кого нет в новом наборе, и INSERT ... ON CONFLICT DO NOTHING
+        для остальных. Возвращает итоговый набор ответственных.
+        """
+        user_ids = set(user_ids)
+        
+        removed = delete(TaskAssignee).where(TaskAssignee.task_id == task_id)
+        if user_ids:
+            removed = removed.where(TaskAssignee.user_id.notin_(user_ids))
+        await self.session.execute(removed)
+        
+        if user_ids:
+            await self.session.execute(
+                insert(TaskAssignee)
+                .values([{"task_id": task_id, "user_id": user_id} for user_id in sorted(user_ids)])
+                .on_conflict_do_nothing(index_elements=[TaskAssignee.task_id, TaskAssignee.user_id])
+            )
+        return user_ids
+    
     async def remove_assignee(self, task_id: int, user_id: int) -> bool:
         """Удалить ответственного"""
         result = await self.session.execute(
@@ -250,4 +380,44 @@ class TaskRepository:
             .order_by(Task.deadline.asc())
         )
         return list(result.scalars().all())
-
+    
+    async def get_reminder_rows(self, project_ids: List[int]) -> List[Row]:
+        """
+        Получить плоские строки для напоминаний по нескольким проектам:
+        (user_id, project_id, project_name, title, deadline, is_overdue).
+        Статус, окно дедлайна (reminder_days_before проекта) и настройки
+        проекта фильтруются в БД одним запросом.
+        """
+        if not project_ids:
+            return []
+        
+        now = datetime.utcnow()
+        deadline_threshold = literal(now, DateTime) + func.make_interval(
+            0, 0, 0, Project.reminder_days_before
+        )
+        
+        result = await self.session.execute(
+            select(
+                TaskAssignee.user_id,
+                Task.project_id,
+                Project.name.label("project_name"),
+                Task.title,
+                Task.deadline,
+                (Task.deadline < now).label("is_overdue"),
+            )
+            .select_from(Task)
+            .join(Project, Project.id == Task.project_id)
+            .join(TaskAssignee, TaskAssignee.task_id == Task.id)
+            .where(
+                and_(
+                    Task.project_id.in_(project_ids),
+                    Project.is_active == True,
+                    Project.reminders_enabled == True,
+                    Task.status.notin_([TaskStatus.COMPLETED.value, TaskStatus.NOT_COMPLETED.value]),
+                    Task.deadline.isnot(None),
+                    Task.deadline <= deadline_threshold,
+                )
+            )
+            .order_by(Task.deadline.asc(), Task.id.asc())
+        )
+        return list(result.all())
@@ -1,6 +1,8 @@
+from datetime import datetime
 from typing import Optional, List
 
-from sqlalchemy import select
+from sqlalchemy import select, func, or_, literal_column
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.models import User
@@ -45,6 +47,48 @@ class UserRepository:
         await self.session.flush()
         return user, True
     
+    async def sync_profile(
+        self,
+        telegram_id: int,
+        username: Optional[str],
+        first_name: str,
+        last_name: Optional[str] = None,
+    ) -> tuple[bool, bool]:
+        """
+        Создать пользователя или обновить его профиль одним запросом.
+        Строка перезаписывается, только если данные отличаются.
+        Возвращает (written, created)
+        """
+        stmt = insert(User).values(
+            telegram_id=telegram_id,
+            username=username,
+            first_name=first_name,
+            last_name=last_name,
+            is_admin=False,
+            created_at=datetime.utcnow(),
+            updated_at=datetime.utcnow(),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.telegram_id],
+            set_={
+                "username": stmt.excluded.username,
+                "first_name": stmt.excluded.first_name,
+                "last_name": stmt.excluded.last_name,
+                "updated_at": stmt.excluded.updated_at,
+            },
+            where=or_(
+                User.username.is_distinct_from(stmt.excluded.username),
+                User.first_name.is_distinct_from(stmt.excluded.first_name),
+                User.last_name.is_distinct_from(stmt.excluded.last_name),
+            ),
+        ).returning(literal_column("xmax = 0").label("created"))
+        
+        result = await self.session.execute(stmt)
+        row = result.one_or_none()
+        if row is None:
+            return False, False
+        return True, bool(row.created)
+    
     async def get_all(self) -> List[User]:
         """Получить всех пользователей"""
         result = await self.session.execute(select(User))
@@ -57,10 +101,28 @@ class UserRepository:
             user.is_admin = is_admin
         return user
     
-    async def search_by_username(self, username: str) -> List[User]:
-        """Поиск пользователей по username"""
+    async def get_by_username(self, username: str) -> Optional[User]:
+        """Получить пользователя по точному username без учёта регистра (idx_users_username_lower)"""
+        result = await self.session.execute(
+            select(User)
+            .where(func.lower(User.username) == username.lstrip("@").lower())
+            .order_by(User.updated_at.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+    
+    async def search_by_username(self, username: str, limit: int = 10) -> List[User]:
+        """
+        Нечёткий поиск пользователей по username (idx_users_username_trgm):
+        подстрока или похожее написание, самые похожие первыми
+        """
+        query = username.lstrip("@").lower()
+        lowered = func.lower(User.username)
         result = await self.session.execute(
-            select(User).where(User.username.ilike(f"%{username}%"))
+            select(User)
+            .where(lowered.contains(query, autoescape=True) | lowered.op("%")(query))
+            .order_by(func.similarity(lowered, query).desc(), User.id)
+            .limit(limit)
         )
         return list(result.scalars().all())
 
@@ -1,19 +1,32 @@
 """FastAPI приложение для управления ролями"""
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
 from fastapi.templating import Jinja2Templates
 from fastapi import HTTPException
 from pydantic import BaseModel
 from typing import Optional, List
-from database.connection import get_db_manager
-from database.repositories import ProjectRepository
+from database.connection import get_db_manager, init_db, close_db
+from database.cache import invalidate_membership
+from database.repositories import OutboxRepository, ProjectRepository, RoleRepository
 from database.models import Project, ProjectRole, ProjectMember, User
 from sqlalchemy import select
-import json
 from pathlib import Path
 
-app = FastAPI(title="VShu Task Bot - Role Constructor")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Пул соединений создаётся при запуске и закрывается при остановке"""
+    await init_db()
+    try:
+        yield
+    finally:
+        await close_db()
+
+
+app = FastAPI(title="VShu Task Bot - Role Constructor", lifespan=lifespan)
 
 # Настраиваем пути для шаблонов
 web_dir = Path(__file__).parent
@@ -29,6 +42,7 @@ class RoleCreate(BaseModel):
     can_manage_tasks: bool = True
     can_manage_members: bool = False
     can_manage_settings: bool = False
+    max_members: Optional[int] = None
     managed_by: List[int] = []
 
 
@@ -40,6 +54,7 @@ class RoleUpdate(BaseModel):
     can_manage_tasks: bool = True
     can_manage_members: bool = False
     can_manage_settings: bool = False
+    max_members: Optional[int] = None
     managed_by: List[int] = []
 
 
@@ -54,6 +69,12 @@ async def index(request: Request):
     return templates.TemplateResponse("role_constructor.html", {"request": request})
 
 
+@app.get("/api/stats/db")
+async def get_db_stats():
+    """Загрузка пулов соединений (основная БД и реплика) и время ожидания соединений"""
+    return get_db_manager().pool_stats_report()
+
+
 @app.get("/api/projects")
 async def get_projects():
     """Получить список проектов"""
@@ -73,54 +94,14 @@ async def get_projects():
 async def get_project_roles(project_id: int):
     """Получить роли проекта"""
     db = get_db_manager()
+    # С основной БД: конструктор перечитывает список сразу после своих изменений,
+    # реплика могла их ещё не получить
     async with db.session() as session:
-        result = await session.execute(
-            select(ProjectRole).where(ProjectRole.project_id == project_id)
-        )
-        roles = result.scalars().all()
-        
-        # Получаем участников для каждой роли
-        result = await session.execute(
-            select(ProjectMember, User).join(User).where(
-                ProjectMember.project_id == project_id
-            )
-        )
-        members_data = result.all()
-    
-    roles_data = []
-    for role in roles:
-        # Находим участников с этой ролью
-        members = [
-            {
-                'id': member.user_id,
-                'name': user.full_name,
-                'username': user.username
-            }
-            for member, user in members_data
-            if member.role_id == role.id
-        ]
-        
-        managed_by = []
-        if role.managed_by_role_ids:
-            try:
-                managed_by = json.loads(role.managed_by_role_ids)
-            except:
-                pass
-        
-        roles_data.append({
-            'id': role.id,
-            'name': role.name,
-            'description': role.description,
-            'level': role.level,
-            'can_manage_roles': role.can_manage_roles,
-            'can_manage_tasks': role.can_manage_tasks,
-            'can_manage_members': role.can_manage_members,
-            'can_manage_settings': role.can_manage_settings,
-            'managed_by': managed_by,
-            'members': members
-        })
+        role_repo = RoleRepository(session)
+        roles_json = await role_repo.get_roles_json(project_id)
     
-    return roles_data
+    # JSON собран в БД, повторно не кодируем
+    return Response(content=roles_json, media_type="application/json")
 
 
 @app.post("/api/projects/{project_id}/roles")
@@ -137,10 +118,14 @@ async def create_role(project_id: int, role_data: RoleCreate):
             can_manage_tasks=role_data.can_manage_tasks,
             can_manage_members=role_data.can_manage_members,
             can_manage_settings=role_data.can_manage_settings,
-            managed_by_role_ids=json.dumps(role_data.managed_by)
+            max_members=role_data.max_members
         )
         session.add(role)
         await session.flush()
+        
+        error = await RoleRepository(session).set_managers(role, role_data.managed_by)
+        if error:
+            raise HTTPException(status_code=400, detail=error)
         role_id = role.id
     
     return {'id': role_id, 'success': True}
@@ -169,7 +154,12 @@ async def update_role(project_id: int, role_id: int, role_data: RoleUpdate):
         role.can_manage_tasks = role_data.can_manage_tasks
         role.can_manage_members = role_data.can_manage_members
         role.can_manage_settings = role_data.can_manage_settings
-        role.managed_by_role_ids = json.dumps(role_data.managed_by)
+        role.max_members = role_data.max_members
+        
+        error = await RoleRepository(session).set_managers(role, role_data.managed_by)
+        if error:
+            raise HTTPException(status_code=400, detail=error)
+        await invalidate_membership(session, project_id)
     
     return {'success': True}
 
@@ -190,30 +180,45 @@ async def delete_role(project_id: int, role_id: int):
         if not role:
             raise HTTPException(status_code=404, detail="Role not found")
         
-        await session.delete(role)
+        await RoleRepository(session).delete(role)
+        await invalidate_membership(session, project_id)
     
     return {'success': True}
 
 
+async def _role_notification_text(session, project_id: int, role: ProjectRole) -> str:
+    """Текст уведомления о назначении на роль"""
+    project_name = await session.scalar(select(Project.name).where(Project.id == project_id))
+    
+    lines = [
+        "🎯 <b>Вас назначили на роль в проекте!</b>\n",
+        f"📁 <b>Проект:</b> {project_name or 'Неизвестный'}",
+        f"👤 <b>Ваша роль:</b> {role.name}",
+    ]
+    if role.description:
+        lines.append(f"📝 {role.description}")
+    
+    # Если это не проектник, показываем информацию о старшем
+    if role.level > 0:
+        manager_names = await RoleRepository(session).get_manager_names(role.id)
+        if manager_names:
+            lines.append(f"\n👔 <b>Ваш старший:</b> {', '.join(manager_names)}")
+    
+    lines.append("\n✅ Теперь вы можете работать с задачами проекта через бота!")
+    return "\n".join(lines)
+
+
 @app.post("/api/projects/{project_id}/members")
 async def add_member_to_role(project_id: int, member_data: MemberAdd):
     """Добавить участника к роли"""
     from database.repositories import UserRepository
-    from bot.config import settings
-    from aiogram import Bot
     
     db = get_db_manager()
     async with db.session() as session:
         # Ищем пользователя по username
         username = member_data.username.lstrip('@').lower()
         user_repo = UserRepository(session)
-        users = await user_repo.search_by_username(username)
-        
-        # Ищем точное совпадение
-        user = next(
-            (u for u in users if u.username and u.username.lower() == username),
-            None
-        )
+        user = await user_repo.get_by_username(username)
         
         if not user:
             raise HTTPException(
@@ -242,6 +247,17 @@ async def add_member_to_role(project_id: int, member_data: MemberAdd):
         )
         member = result.scalar_one_or_none()
         
+        if not member or member.role_id != role.id:
+            project_repo = ProjectRepository(session)
+            error = await project_repo.check_role_limit(
+                project_id,
+                role.max_members,
+                role_id=role.id,
+                exclude_user_id=user.telegram_id,
+            )
+            if error:
+                raise HTTPException(status_code=409, detail=error)
+        
         if member:
             # Обновляем роль
             old_role_id = member.role_id
@@ -256,60 +272,13 @@ async def add_member_to_role(project_id: int, member_data: MemberAdd):
             session.add(member)
         
         await session.flush()
+        await invalidate_membership(session, project_id, user.telegram_id)
         
-        # Получаем информацию о проекте для уведомления
-        result = await session.execute(
-            select(Project).where(Project.id == project_id)
-        )
-        project = result.scalar_one_or_none()
-        
-        # Отправляем уведомление пользователю через бота
-        if settings.bot_token:
-            try:
-                bot = Bot(token=settings.bot_token)
-                
-                # Формируем сообщение о роли
-                role_message = f"🎯 <b>Вас назначили на роль в проекте!</b>\n\n"
-                role_message += f"📁 <b>Проект:</b> {project.name if project else 'Неизвестный'}\n"
-                role_message += f"👤 <b>Ваша роль:</b> {role.name}\n"
-                
-                if role.description:
-                    role_message += f"📝 {role.description}\n"
-                
-                # Если это не проектник, показываем информацию о старшем
-                if role.level > 0:
-                    # Ищем роли, которые управляют этой ролью
-                    if role.managed_by_role_ids:
-                        try:
-                            managed_by_ids = json.loads(role.managed_by_role_ids)
-                            if managed_by_ids:
-                                result = await session.execute(
-                                    select(ProjectRole).where(
-                                        ProjectRole.id.in_(managed_by_ids),
-                                        ProjectRole.project_id == project_id
-                                    )
-                                )
-                                manager_roles = result.scalars().all()
-                                
-                                if manager_roles:
-                                    role_message += f"\n👔 <b>Ваш старший:</b> "
-                                    role_message += ", ".join([r.name for r in manager_roles])
-                        except:
-                            pass
-                
-                role_message += "\n\n✅ Теперь вы можете работать с задачами проекта через бота!"
-                
-                await bot.send_message(
-                    chat_id=user.telegram_id,
-                    text=role_message,
-                    parse_mode="HTML"
-                )
-                await bot.session.close()
-            except Exception as e:
-                # Логируем ошибку, но не прерываем процесс
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.warning(f"Failed to send role notification to user {user.telegram_id}: {e}")
+        # Уведомление пишется в outbox в той же транзакции, что и назначение,
+        # и отправляется диспетчером бота — ответ не ждёт Telegram
+        role_message = await _role_notification_text(session, project_id, role)
+        outbox_repo = OutboxRepository(session)
+        await outbox_repo.add(user.telegram_id, role_message)
     
     return {'success': True}
 